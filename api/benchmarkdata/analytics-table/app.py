@@ -1,4 +1,5 @@
 import os
+import sys
 import random
 from flask import Flask, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
@@ -7,10 +8,15 @@ from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from werkzeug.utils import secure_filename
 
+# common.py lives next to the main app, one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import (configure_sqlite, date_range_bounds, dispose_engines_after_fork, init_metrics,  # noqa: E402
+                    migrate_event_time)
+
 app = Flask(__name__)
 
 # Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///analytics.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///analytics.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1000 * 1000  # 500 MB
 
@@ -20,14 +26,26 @@ app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif', 'mp4'}
 app.config['CORS_HEADER'] = 'application/json'
 app.config['SECURE_TOKEN'] = 'your_secure_token'  # Replace with a strong secure token
 
+configure_sqlite(app)  # SQLITE_PROFILE pragmas and pool options, see ../common.py
+
 db = SQLAlchemy(app)
 
+dispose_engines_after_fork(app, db)
+
+# request and commit metrics, served on /metrics
+metrics = init_metrics(app, upload_endpoints=("analytics_action", "handle_file_upload"))
+
 # Database model
 class Analytics(db.Model):
+    __table_args__ = (
+        db.Index("ix_analytics_user_time", "user_id", "event_time"),
+        db.Index("ix_analytics_camera_time", "camera_id", "event_time"),
+    )
     analytics_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     log_image = db.Column(db.String(255))
     log_video = db.Column(db.String(255))
     create_date = db.Column(db.String(50))
+    event_time = db.Column(db.DateTime, index=True)  # typed copy of create_date used for range filters
     message = db.Column(db.String(255))
     camera_id = db.Column(db.String(50))
     camera_location = db.Column(db.String(255))
@@ -84,10 +102,12 @@ def analytics_action():                                                 ########
 
         user_id = request.form.get('user_id', 'default_user')  # Default user_id if not provided
 
+        now = datetime.now()
         new_action = Analytics(
             log_image=image_path,
             log_video=video_path,
-            create_date=str(datetime.now()),
+            create_date=str(now),
+            event_time=now,
             message=generate_random_message(),
             camera_id=generate_random_camera(),
             camera_location="Location A",
@@ -124,10 +144,12 @@ def analytics_insertinto():
 
         user_id = request.form.get('user_id', 'testuser_02')  # Default user_id if not provided
 
+        now = datetime.now()
         new_record = Analytics(
             log_image=log_image,
             log_video=log_video,
-            create_date=str(datetime.now()),
+            create_date=str(now),
+            event_time=now,
             message=generate_random_message(),
             camera_id=generate_random_camera(),
             camera_location="Location B",
@@ -217,8 +239,16 @@ def analytics_report():
         start_date = data.get('start_date')
         end_date = data.get('end_date')
 
-        # Fetch analytics data within the date range
-        report_data = Analytics.query.filter(Analytics.create_date.between(start_date, end_date)).all()
+        try:
+            range_start, range_end = date_range_bounds(start_date, end_date)
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+
+        # Fetch analytics data within the date range (index range scan on event_time)
+        report_data = Analytics.query.filter(
+            Analytics.event_time >= range_start,
+            Analytics.event_time < range_end,
+        ).order_by(Analytics.event_time).all()
 
         # Directory to save the PDF
         pdf_dir = r"D:/Projects_ITech/ai.cam_github_repositories/AnalyticsDashboardAPI/api/benchmarkdata/uploads" ### change path of pdfs folder to your actual path  ##############
@@ -377,4 +407,7 @@ def handle_file_upload():
 
 
 if __name__ == '__main__':
+    with app.app_context():
+        db.create_all()
+        migrate_event_time(db, Analytics)
     app.run(debug=True)
@@ -4,10 +4,15 @@ db = SQLAlchemy()
 
 class Analytics(db.Model):
     __tablename__ = 'analytics'
+    __table_args__ = (
+        db.Index("ix_analytics_user_time", "user_id", "event_time"),
+        db.Index("ix_analytics_camera_time", "camera_id", "event_time"),
+    )
     analytics_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     log_image = db.Column(db.String(255))
     log_video = db.Column(db.String(255))
     create_date = db.Column(db.String(255))
+    event_time = db.Column(db.DateTime, index=True)  # typed copy of create_date used for range filters
     message = db.Column(db.String(255))
     camera_id = db.Column(db.String(255), nullable=False)
     camera_location = db.Column(db.String(255))
@@ -1,22 +1,205 @@
+import io
 import os
+import re
+import csv
+import json
+import logging
+import uuid
+import hashlib
+import tempfile
+import time
+import heapq
+import queue
+import atexit
+import base64
 import random
-from flask import Flask, request, jsonify
+import shutil
+import subprocess
+import threading
+import multiprocessing
+from itertools import chain, islice
+from contextlib import ExitStack, closing, contextmanager
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from flask import Flask, Response, g, has_request_context, request, jsonify, send_file, stream_with_context, url_for
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from sqlalchemy import (bindparam, case, create_engine, delete, event, func, insert, inspect, literal, select, text,
+                        true, tuple_, update)
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, column_property
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datetime import datetime, timedelta
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 from werkzeug.utils import secure_filename
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required
+from common import (configure_sqlite, date_range_bounds, dispose_engines_after_fork, init_metrics,
+                    migrate_event_time, parse_event_time)
+try:
+    import orjson  # optional: several times faster JSON encoding for large list responses
+except ImportError:
+    orjson = None
+try:
+    from PIL import Image, ImageOps  # optional: image thumbnails for the list routes
+except ImportError:
+    Image = ImageOps = None
+try:
+    import fcntl  # POSIX: file locks shared by every worker process
+except ImportError:
+    fcntl = None
 
 
 
 # Initialize the Flask App
 app = Flask(__name__)
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///benchmarkdata_db.db"
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///benchmarkdata_db.db")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["JWT_SECRET_KEY"] = "your_secure_token"  # Change this to a secure secret in production
 
+configure_sqlite(app)  # SQLITE_PROFILE pragmas and pool options, see common.py
+
 db = SQLAlchemy(app)
+
+dispose_engines_after_fork(app, db, lambda: _partition_engines.values())
+
+@app.errorhandler(OperationalError)
+def database_busy(e):
+    if "locked" not in str(e.orig):
+        raise e
+    db.session.rollback()
+    return jsonify({'status': 'error', 'message': 'Database is busy, retry later'}), 503, {'Retry-After': '1'}
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Output matches the default provider: sorted keys, pretty-printed in debug mode,
+    and dates go through the same default() hook, so clients see no difference.
+    """
+
+    def _options(self):
+        option = orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._options()) + b"\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+
+class ModelSerializer:
+    """Turns query rows of one model into response dicts, loading only the requested columns.
+
+    fields lists the columns a client may ask for; converters maps a field name to a
+    function applied to its value (e.g. media keys to paths).
+    """
+
+    def __init__(self, model, fields, converters=None):
+        self.model = model
+        self.fields = tuple(fields)
+        self.converters = converters or {}
+
+    def parse_fields(self, requested, default):
+        """Field names for a fields= value (list or comma-separated string), in model order.
+
+        Raises ValueError for names that are not exposed.
+        """
+        if not requested:
+            return tuple(default)
+        if isinstance(requested, str):
+            requested = requested.split(',')
+        wanted = {str(name).strip() for name in requested} - {''}
+        unknown = wanted - set(self.fields)
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+        return tuple(name for name in self.fields if name in wanted)
+
+    def project(self, query, names, *extra):
+        """Restrict query to the columns for names, followed by any extra columns."""
+        return query.with_entities(*(getattr(self.model, name) for name in names), *extra)
+
+    def iter_dicts(self, rows, names):
+        """Dicts for rows whose leading columns are names; trailing extra columns are dropped."""
+        convert = [(i, self.converters[name]) for i, name in enumerate(names) if name in self.converters]
+        if not convert:
+            return (dict(zip(names, row)) for row in rows)
+        return (dict(zip(names, self._convert(row, convert))) for row in rows)
+
+    @staticmethod
+    def _convert(row, convert):
+        values = list(row)
+        for i, converter in convert:
+            values[i] = converter(values[i])
+        return values
+
+    def to_dicts(self, rows, names):
+        return list(self.iter_dicts(rows, names))
+
+    def all(self, query, names):
+        return self.to_dicts(self.project(query, names).all(), names)
+
+def requested_fields(data=None):
+    """The fields= parameter from a JSON body, or else from the query string."""
+    fields = data.get('fields') if isinstance(data, dict) else None
+    return fields if fields is not None else request.args.get('fields')
+
+def is_match_value(value):
+    """True for the scalar types a bulk delete can match a column against."""
+    return isinstance(value, (str, int)) and not isinstance(value, bool)
+
+def bulk_delete_conditions(data, id_column, filter_columns, range_column=None):
+    """WHERE conditions for a bulk delete request; raises ValueError for a bad request.
+
+    data holds a list of ids under the id column's name plus "s" (e.g. "camera_ids"),
+    and/or a "filter" object of exact matches on filter_columns, where a list value
+    matches any of its items. With range_column, the filter may also carry
+    start_date/end_date for a range on that column. Rows must match everything given,
+    and something must be given, so an empty request never deletes the whole table.
+    """
+    ids_key = id_column.key + 's'
+    ids, filters = data.get(ids_key), data.get('filter')
+    conditions = []
+    if ids is not None:
+        if not isinstance(ids, list) or not ids or not all(is_match_value(item) for item in ids):
+            raise ValueError(f'{ids_key} must be a non-empty list of strings or integers')
+        if len(ids) > app.config['BULK_DELETE_MAX_IDS']:
+            raise ValueError(f"At most {app.config['BULK_DELETE_MAX_IDS']} {ids_key} per request")
+        conditions.append(id_column.in_(ids))
+    if filters is not None:
+        if not isinstance(filters, dict) or not filters:
+            raise ValueError('filter must be a non-empty object')
+        filters = dict(filters)
+        if range_column is not None and ('start_date' in filters or 'end_date' in filters):
+            range_start, range_end = date_range_bounds(filters.pop('start_date', None), filters.pop('end_date', None))
+            conditions += [range_column >= range_start, range_column < range_end]
+        unknown = set(filters) - set(filter_columns)
+        if unknown:
+            raise ValueError(f"Cannot filter on {', '.join(sorted(unknown))}")
+        for name, value in filters.items():
+            column = filter_columns[name]
+            items = value if isinstance(value, list) else [value]
+            if not all(is_match_value(item) for item in items):
+                raise ValueError(f'filter {name} must be a string, an integer or a list of them')
+            conditions.append(column.in_(value) if isinstance(value, list) else column == value)
+    if not conditions:
+        raise ValueError(f'Give {ids_key} or filter')
+    return conditions
+
 def get_random_file(directory):
     files = os.listdir(directory)
     return os.path.join(directory, random.choice(files)) if files else None
@@ -33,6 +216,8 @@ def generate_random_message():
 
 # Models
 class User(db.Model):
+    # user_id lookups (login, edit, delete) use the unique index; name is only ever
+    # substring-searched, which a B-tree index cannot serve
     userid = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.String(255), unique=True, nullable=False)
     email = db.Column(db.String(255), nullable=True)
@@ -45,28 +230,41 @@ class User(db.Model):
     status = db.Column(db.String(255), nullable=False)
 
 class Camera(db.Model):
+    # camera_location is only substring-searched (contains), so it is left unindexed
     camera_id = db.Column(db.Integer, primary_key=True)
     camera_url = db.Column(db.String(255), nullable=False)
     camera_location = db.Column(db.String(255), nullable=True)
     status = db.Column(db.String(255), nullable=False)
 
 class Analytics(db.Model):
+    # Access paths: newest-first listing and date ranges (event_time), and per-user
+    # and per-camera history in time order. Text filters go through analytics_fts.
+    # AUTOINCREMENT: ids of deleted or archived rows are never handed out again, so an
+    # id names one row across the table and its partition files.
+    __table_args__ = (
+        db.Index("ix_analytics_user_time", "user_id", "event_time"),
+        db.Index("ix_analytics_camera_time", "camera_id", "event_time"),
+        {"sqlite_autoincrement": True},
+    )
     analytics_id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.String(255), unique=True, nullable=False)  # user_id should match the column in the database
+    user_id = db.Column(db.String(255), nullable=False)  # user_id should match the column in the database
     log_image = db.Column(db.String(255))
     log_video = db.Column(db.String(255))
     create_date = db.Column(db.String(255))
+    event_time = db.Column(db.DateTime, index=True)  # typed copy of create_date used for range filters
     message = db.Column(db.String(255))
     camera_id = db.Column(db.String(255), nullable=False)
     camera_location = db.Column(db.String(255))
     action = db.Column(db.String(255))
     time_to_action = db.Column(db.String(255))
     status = db.Column(db.String(255), nullable=False)
+    # Media key the list thumbnail is made from (image, else video poster); turned into a URL on output
+    thumb_url = column_property(func.coalesce(log_image, log_video), deferred=True)
 
 class Subscription(db.Model):
     subscription_id = db.Column(db.Integer, primary_key=True)
     device_id = db.Column(db.Integer, nullable=False)
-    user_id = db.Column(db.String(255), nullable=False)
+    user_id = db.Column(db.String(255), nullable=False, index=True)
     machine_id = db.Column(db.String(255), nullable=False)
     expiry_date = db.Column(db.String(255), nullable=False)
     camera_count = db.Column(db.String(255), nullable=False)
@@ -78,6 +276,155 @@ class Device(db.Model):
     machine_id = db.Column(db.String(255), unique=True, nullable=False)
     device_location = db.Column(db.String(255), nullable=True)
 
+class MediaObject(db.Model):
+    # One row per stored media blob; ref_count is the number of analytics rows using it
+    content_key = db.Column(db.String(80), primary_key=True)  # <sha256>.<ext>
+    ref_count = db.Column(db.Integer, nullable=False, default=0, index=True)  # 0: file can be reclaimed
+
+class ReportJob(db.Model):
+    job_id = db.Column(db.String(32), primary_key=True)
+    state = db.Column(db.String(20), nullable=False, default="queued", index=True)  # queued, running, done, failed, expired
+    start_date = db.Column(db.String(50))
+    end_date = db.Column(db.String(50))
+    cache_key = db.Column(db.String(64), index=True)  # range + filters + data version, see report_cache_key()
+    file_path = db.Column(db.String(500))
+    file_size = db.Column(db.Integer)
+    error = db.Column(db.Text)
+    worker_pid = db.Column(db.Integer)  # process holding the job: the API process while queued, then the renderer
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    finished_at = db.Column(db.DateTime)
+    last_used_at = db.Column(db.DateTime)
+
+class DashboardCounter(db.Model):
+    # One row per calendar day, kept in step with Analytics so /dashboard never scans it
+    day = db.Column(db.String(10), primary_key=True)  # YYYY-MM-DD
+    total_count = db.Column(db.Integer, nullable=False, default=0)
+    positive_count = db.Column(db.Integer, nullable=False, default=0)
+    negative_count = db.Column(db.Integer, nullable=False, default=0)
+    version = db.Column(db.Integer, nullable=False, default=0)  # bumped on every change to the day's rows
+
+class AnalyticsRollup(db.Model):
+    # Event counts per time bucket, camera, message and status, kept in step with
+    # Analytics for every granularity in ROLLUP_BUCKETS. The primary key doubles as
+    # the (granularity, bucket) range index used by /analytics-timeseries.
+    granularity = db.Column(db.String(10), primary_key=True)  # minute, hour, day
+    bucket = db.Column(db.String(16), primary_key=True)  # bucket start, e.g. "2024-01-05 10:00"
+    camera_id = db.Column(db.String(255), primary_key=True)
+    message = db.Column(db.String(255), primary_key=True)  # "" when the event had no message
+    status = db.Column(db.String(255), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class AnalyticsPartition(db.Model):
+    # One row per month moved out of analytics into its own database file, see archive_analytics_months()
+    month = db.Column(db.String(7), primary_key=True)  # YYYY-MM
+    path = db.Column(db.String(500), nullable=False)
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+
+######################################### metrics #########################################
+
+# request and commit metrics, served on /metrics
+metrics = init_metrics(app, upload_endpoints=("analytics_action", "upload_chunk", "handle_file_upload"))
+
+######################################### SQL profiling #########################################
+# Opt-in (SQL_PROFILING=1 in the environment, or the config key). Every statement is timed
+# through engine events; per request the count, total time and slowest statements are
+# kept, and sent back as X-SQL-* headers in debug mode. Statements slower than
+# SLOW_QUERY_MS go to the slow-query log as one JSON object per line, with the type and
+# length of each parameter; their values only with SLOW_QUERY_LOG_PARAMETERS, and never
+# for statements on a password column.
+
+app.config['SQL_PROFILING'] = os.environ.get("SQL_PROFILING") == "1"
+app.config['SQL_PROFILE_TOP'] = 3  # slowest statements reported per request
+app.config['SLOW_QUERY_MS'] = 100  # statements at least this slow are logged
+app.config['SLOW_QUERY_LOG'] = None  # file for the slow-query log; None logs through the root logger
+app.config['SLOW_QUERY_LOG_PARAMETERS'] = False  # log bound parameter values instead of their types
+
+slow_query_log = logging.getLogger("benchmarkdata.slow_queries")
+_slow_query_log_lock = threading.Lock()
+SENSITIVE_STATEMENT = re.compile(r'\bpassword\b', re.IGNORECASE)  # their values are never logged
+
+def describe_parameter(value):
+    """Type, and length for strings and bytes, of a bound parameter; stands in for its value."""
+    if value is None:
+        return None
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}({len(value)})"
+    return type(value).__name__
+
+def loggable_parameters(statement, parameters):
+    """One parameter set as it may appear in the slow-query log."""
+    if app.config['SLOW_QUERY_LOG_PARAMETERS'] and not SENSITIVE_STATEMENT.search(statement):
+        return parameters
+    if isinstance(parameters, dict):
+        return {name: describe_parameter(value) for name, value in parameters.items()}
+    return [describe_parameter(value) for value in parameters]
+
+def log_slow_query(statement, parameters, executemany, elapsed):
+    if app.config['SLOW_QUERY_LOG'] and not slow_query_log.handlers:
+        with _slow_query_log_lock:
+            if not slow_query_log.handlers:
+                handler = logging.FileHandler(app.config['SLOW_QUERY_LOG'])
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                slow_query_log.addHandler(handler)
+                slow_query_log.propagate = False
+    if executemany:
+        parameters = [loggable_parameters(statement, row) for row in parameters[:5]] + (
+            [f"... {len(parameters) - 5} more"] if len(parameters) > 5 else [])
+    else:
+        parameters = loggable_parameters(statement, parameters)
+    slow_query_log.warning(json.dumps({
+        "ts": datetime.now().isoformat(timespec="milliseconds"),
+        "duration_ms": round(elapsed * 1000, 2),
+        "route": request.url_rule.rule if has_request_context() and request.url_rule else None,
+        "method": request.method if has_request_context() else None,
+        "statement": " ".join(statement.split()),
+        "parameters": parameters,
+        "executemany": executemany,
+    }, default=str))
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    if app.config['SQL_PROFILING']:
+        conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def record_statement_time(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("statement_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    profile = g.get("sql_profile") if has_request_context() else None
+    if profile is not None:
+        profile["count"] += 1
+        profile["time"] += elapsed
+        profile["slowest"].append((elapsed, statement))
+        profile["slowest"] = sorted(profile["slowest"], reverse=True)[:app.config['SQL_PROFILE_TOP']]
+    if elapsed * 1000 >= app.config['SLOW_QUERY_MS']:
+        log_slow_query(statement, parameters, executemany, elapsed)
+
+@event.listens_for(Engine, "handle_error")
+def clear_statement_timer(context):
+    # a failed statement never reaches after_cursor_execute; drop its start time so the
+    # next statement on this connection is not timed from it
+    if context.connection is not None:
+        context.connection.info.pop("statement_started", None)
+
+@app.before_request
+def start_sql_profile():
+    if app.config['SQL_PROFILING']:
+        g.sql_profile = {"count": 0, "time": 0.0, "slowest": []}
+
+@app.after_request
+def add_sql_profile_headers(response):
+    profile = g.get("sql_profile")
+    if profile is not None and app.debug:
+        response.headers["X-SQL-Query-Count"] = str(profile["count"])
+        response.headers["X-SQL-Time-Ms"] = f"{profile['time'] * 1000:.2f}"
+        response.headers["X-SQL-Slowest"] = " | ".join(
+            f"{elapsed * 1000:.2f}ms " + " ".join(statement.split())[:200] for elapsed, statement in profile["slowest"]
+        ).encode("ascii", "replace").decode()
+    return response
+
 # Routes
 ######################################### login page #########################################
 @app.route("/login", methods=["POST"])
@@ -106,21 +453,115 @@ def register():
     )
     db.session.add(new_user)
     db.session.commit()
+    list_cache.invalidate("user")
     return jsonify({"msg": "User registered successfully"}), 201
 
 ################################# dashboard page #################################################
 
+def bump_dashboard_counters(rows, sign=1):
+    """Add (sign=1) or remove (sign=-1) analytics rows from the daily dashboard counters.
+
+    rows is an iterable of (event_time, status) pairs. The upsert runs on the
+    current session, so it commits in the same transaction as the rows themselves.
+    Legacy rows without an event_time belong to no day and are skipped, as in
+    counter_totals().
+    """
+    deltas = {}
+    for event_time, status in rows:
+        if event_time is None:
+            continue
+        day = str(event_time)[:10]
+        total, positive, negative = deltas.get(day, (0, 0, 0))
+        deltas[day] = (
+            total + sign,
+            positive + (sign if status == "true" else 0),
+            negative + (sign if status == "false" else 0),
+        )
+    apply_counter_deltas(deltas)
+
+def apply_counter_deltas(deltas):
+    """Upsert {day: (total, positive, negative)} deltas and bump each touched day's version."""
+    if not deltas:
+        return
+    stmt = sqlite_insert(DashboardCounter)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DashboardCounter.day],
+        set_={
+            "total_count": DashboardCounter.total_count + stmt.excluded.total_count,
+            "positive_count": DashboardCounter.positive_count + stmt.excluded.positive_count,
+            "negative_count": DashboardCounter.negative_count + stmt.excluded.negative_count,
+            "version": DashboardCounter.version + 1,
+        },
+    )
+    db.session.execute(stmt, [
+        {"day": day, "total_count": t, "positive_count": p, "negative_count": n, "version": 1}
+        for day, (t, p, n) in deltas.items()
+    ])
+
+def reset_dashboard_counters():
+    """Zero every day's counters. Versions keep increasing so cached reports stay invalid."""
+    DashboardCounter.query.update({
+        DashboardCounter.total_count: 0,
+        DashboardCounter.positive_count: 0,
+        DashboardCounter.negative_count: 0,
+        DashboardCounter.version: DashboardCounter.version + 1,
+    })
+
+def counter_totals(executor):
+    """{day: (total, positive, negative)} over the analytics table of a session or connection."""
+    day = func.date(Analytics.event_time)
+    totals = executor.execute(select(
+        day,
+        func.count(Analytics.analytics_id),
+        func.sum(case((Analytics.status == "true", 1), else_=0)),
+        func.sum(case((Analytics.status == "false", 1), else_=0)),
+    ).group_by(day)).all()
+    return {d: (t, p, n) for d, t, p, n in totals if d}
+
+def rebuild_dashboard_counters():
+    """Recompute the daily counters from the raw analytics rows, one grouped pass per database file."""
+    deltas = counter_totals(db.session)
+    for partition in analytics_partitions(db.session):
+        with partition_engine(partition.path).connect() as conn:
+            for d, (t, p, n) in counter_totals(conn).items():
+                total, positive, negative = deltas.get(d, (0, 0, 0))
+                deltas[d] = (total + t, positive + p, negative + n)
+
+    reset_dashboard_counters()
+    apply_counter_deltas(deltas)
+    db.session.commit()
+
+def analytics_range_version(range_start, range_end):
+    """Data version of the analytics rows in [range_start, range_end).
+
+    The sum of the per-day versions only ever grows, and grows whenever a row in one of
+    the covered days is inserted or deleted, so it identifies the range's current data.
+    """
+    last_day = range_end - timedelta(microseconds=1)
+    return db.session.query(func.coalesce(func.sum(DashboardCounter.version), 0)).filter(
+        DashboardCounter.day.between(range_start.strftime("%Y-%m-%d"), last_day.strftime("%Y-%m-%d"))
+    ).scalar()
+
 @app.route("/dashboard", methods=["POST"])
 @jwt_required()
 def dashboard():
     data = request.get_json()
-    start_date = datetime.strptime(data["start_date"], "%Y-%m-%d")
-    end_date = datetime.strptime(data["end date"], "%Y-%m-%d")
-
-    total_analytics = Analytics.query.count()
-    positive_count = Analytics.query.filter(Analytics.status == "true").count()
-    negative_count = Analytics.query.filter(Analytics.status == "false").count()
-    cam_count = Camera.query.count()
+    try:
+        range_start, range_end = date_range_bounds(data.get("start_date"), data.get("end_date") or data.get("end date"))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    last_day = range_end - timedelta(microseconds=1)
+
+    # Single statement over the per-day counters: O(days in range), independent of table size
+    cam_count = db.session.query(func.count(Camera.camera_id)).scalar_subquery()
+    total_analytics, positive_count, negative_count, cam_count = db.session.query(
+        func.coalesce(func.sum(DashboardCounter.total_count), 0),
+        func.coalesce(func.sum(DashboardCounter.positive_count), 0),
+        func.coalesce(func.sum(DashboardCounter.negative_count), 0),
+        cam_count,
+    ).filter(
+        DashboardCounter.day.between(range_start.strftime("%Y-%m-%d"), last_day.strftime("%Y-%m-%d"))
+    ).one()
 
     return jsonify({
         "analytics_id_count": total_analytics,
@@ -132,12 +573,155 @@ def dashboard():
 
 
 
+################################## time series ################################################
+
+# granularity -> strftime() format of the bucket start; the Python and SQL sides must agree
+ROLLUP_BUCKETS = {
+    "minute": "%Y-%m-%d %H:%M",
+    "hour": "%Y-%m-%d %H:00",
+    "day": "%Y-%m-%d",
+}
+ROLLUP_GROUP_FIELDS = ("camera_id", "message", "status")
+
+def bump_analytics_rollups(rows, sign=1):
+    """Add (sign=1) or remove (sign=-1) analytics rows from the rollups in the current session.
+
+    rows is an iterable of (event_time, camera_id, message, status) tuples.
+    """
+    deltas = {}
+    for event_time, camera_id, message, status in rows:
+        if event_time is None:
+            continue
+        for granularity, fmt in ROLLUP_BUCKETS.items():
+            key = (granularity, event_time.strftime(fmt), camera_id, message or "", status)
+            deltas[key] = deltas.get(key, 0) + sign
+    apply_rollup_deltas(deltas)
+
+def apply_rollup_deltas(deltas):
+    """Upsert {(granularity, bucket, camera_id, message, status): count} deltas into the rollups."""
+    deltas = {key: count for key, count in deltas.items() if count}
+    if not deltas:
+        return
+
+    stmt = sqlite_insert(AnalyticsRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AnalyticsRollup.granularity, AnalyticsRollup.bucket, AnalyticsRollup.camera_id,
+                        AnalyticsRollup.message, AnalyticsRollup.status],
+        set_={"count": AnalyticsRollup.count + stmt.excluded["count"]},
+    )
+    db.session.execute(stmt, [
+        {"granularity": g, "bucket": b, "camera_id": c, "message": m, "status": st, "count": n}
+        for (g, b, c, m, st), n in deltas.items()
+    ])
+
+def grouped_rollup_select(granularity):
+    """One granularity's rollup rows computed from the raw analytics table."""
+    bucket = func.strftime(ROLLUP_BUCKETS[granularity], Analytics.event_time)
+    message = func.coalesce(Analytics.message, "")
+    return select(
+        literal(granularity), bucket, Analytics.camera_id, message, Analytics.status,
+        func.count(),
+    ).where(Analytics.event_time.isnot(None)).group_by(bucket, Analytics.camera_id, message, Analytics.status)
+
+def rollup_totals(executor):
+    """Rollup counts over the analytics table of a session or connection, as apply_rollup_deltas() takes them."""
+    totals = {}
+    for granularity in ROLLUP_BUCKETS:
+        for gran, bucket, camera_id, message, status, count in executor.execute(grouped_rollup_select(granularity)):
+            totals[(gran, bucket, camera_id, message, status)] = count
+    return totals
+
+def rebuild_analytics_rollups():
+    """Recompute every rollup from the raw analytics table, one grouped INSERT per granularity,
+    then add the archived months from their partition files."""
+    AnalyticsRollup.query.delete()
+    for granularity in ROLLUP_BUCKETS:
+        db.session.execute(insert(AnalyticsRollup).from_select(
+            ["granularity", "bucket", "camera_id", "message", "status", "count"], grouped_rollup_select(granularity)
+        ))
+    for partition in analytics_partitions(db.session):
+        with partition_engine(partition.path).connect() as conn:
+            apply_rollup_deltas(rollup_totals(conn))
+    db.session.commit()
+
+@app.route("/analytics-timeseries", methods=["POST"])
+@jwt_required()
+def analytics_timeseries():
+    """Event counts per time bucket within a date range, read from the rollups.
+
+    Optional camera_id, message and status narrow the events counted; group_by (a list of
+    those field names) splits each bucket into one point per distinct value.
+    Buckets are whole: one that starts inside the range is counted in full.
+    """
+    data = request.get_json() or {}
+    interval = data.get('interval', 'hour')
+    if interval not in ROLLUP_BUCKETS:
+        return jsonify({'status': 'error', 'message': f'interval must be one of {", ".join(ROLLUP_BUCKETS)}'}), 400
+    group_by = data.get('group_by') or []
+    if isinstance(group_by, str):
+        group_by = [group_by]
+    unknown = [field for field in group_by if field not in ROLLUP_GROUP_FIELDS]
+    if unknown:
+        return jsonify({'status': 'error', 'message': f'Cannot group by {", ".join(map(str, unknown))}'}), 400
+    try:
+        range_start, range_end = date_range_bounds(data.get('start_date'), data.get('end_date'))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    bucket_seconds = {"minute": 60, "hour": 3600, "day": 86400}[interval]
+    if (range_end - range_start).total_seconds() / bucket_seconds > app.config['TIMESERIES_MAX_BUCKETS']:
+        return jsonify({'status': 'error', 'message': 'Range has too many buckets, use a coarser interval'}), 400
+
+    fmt = ROLLUP_BUCKETS[interval]
+    last = range_end - timedelta(microseconds=1)
+    columns = [getattr(AnalyticsRollup, field) for field in group_by]
+    query = db.session.query(AnalyticsRollup.bucket, *columns, func.sum(AnalyticsRollup.count)).filter(
+        AnalyticsRollup.granularity == interval,
+        AnalyticsRollup.bucket.between(range_start.strftime(fmt), last.strftime(fmt)),
+    )
+    for field in ROLLUP_GROUP_FIELDS:
+        if data.get(field) is not None:
+            query = query.filter(getattr(AnalyticsRollup, field) == str(data[field]))
+    query = query.group_by(AnalyticsRollup.bucket, *columns).having(func.sum(AnalyticsRollup.count) > 0)
+
+    series = []
+    for row in query.order_by(AnalyticsRollup.bucket, *columns):
+        point = {'bucket': row[0], 'count': row[-1]}
+        point.update(zip(group_by, row[1:-1]))
+        series.append(point)
+    return jsonify({'status': 'success', 'interval': interval, 'series': series}), 200
+
 ################################## analytics  page ################################################
 
 
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1000 * 1000  # 500 MB
 app.config['UPLOAD_FOLDER'] = 'D:/Projects_ITech/ai.cam_github_repositories/AnalyticsDashboardAPI/api/benchmarkdata/uploads'  
 app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif', 'mp4'}
+app.config['UPLOAD_CHUNK_SIZE'] = 8 * 1024 * 1024  # largest body accepted per /upload-chunk request
+app.config['UPLOAD_BUFFER_SIZE'] = 64 * 1024  # bytes copied from the socket to disk per read
+app.config['MAX_CHUNKED_UPLOAD_SIZE'] = 10 * 1000 * 1000 * 1000  # 10 GB per chunked upload
+app.config['UPLOAD_STALE_AFTER'] = 24 * 3600  # seconds since its last write before a chunked upload is swept
+app.config['REPORT_FOLDER'] = None  # where PDF reports are written; defaults to UPLOAD_FOLDER/reports
+app.config['REPORT_WORKERS'] = 2  # report render processes; 0 renders inline in the request thread
+app.config['REPORT_MAX_PENDING'] = 20  # queued + running report jobs before new ones are refused
+app.config['REPORT_FETCH_SIZE'] = 2000  # rows pulled per fetch while rendering a report
+app.config['REPORT_JOB_TIMEOUT'] = 3600  # seconds a job may stay queued or running before it is failed as stale
+app.config['REPORT_CACHE_MAX_AGE'] = 7 * 24 * 3600  # seconds an unused cached report is kept
+app.config['REPORT_CACHE_MAX_BYTES'] = 2 * 1000 * 1000 * 1000  # 2 GB of cached report files
+app.config['DEFAULT_PAGE_SIZE'] = 100  # search page size when row_count is not given
+app.config['MAX_PAGE_SIZE'] = 500  # hard cap on rows per page for viewall/search
+app.config['TIMESERIES_MAX_BUCKETS'] = 10000  # largest series /analytics-timeseries will return
+app.config['STREAM_BATCH_SIZE'] = 1000  # rows fetched per round-trip when streaming NDJSON
+app.config['MAX_BATCH_SIZE'] = 1000  # events accepted per /analytics-batch request
+app.config['BULK_DELETE_MAX_IDS'] = 10000  # ids accepted per *-delete-bulk request
+app.config['WRITE_BEHIND_ENABLED'] = False  # queue single-event inserts for group commit instead of committing per request
+app.config['WRITE_BEHIND_MAX_QUEUE'] = 10000  # queued events before requests get backpressure
+app.config['WRITE_BEHIND_MAX_BATCH'] = 500  # events per group commit
+app.config['WRITE_BEHIND_FLUSH_INTERVAL'] = 0.05  # seconds the writer waits to fill a batch
+app.config['WRITE_BEHIND_PUT_TIMEOUT'] = 1.0  # seconds a request waits for queue space before 503
+app.config['WRITE_BEHIND_RETRIES'] = 3  # retries of a failed group commit before rows are inserted one by one
+app.config['WRITE_BEHIND_RETRY_DELAY'] = 0.2  # seconds before the first retry; doubles on each retry
+app.config['SEARCH_USE_FTS'] = True  # cleared by init_db() when SQLite lacks FTS5/trigram support
 
 # Utility functions
 def generate_random_camera():
@@ -148,6 +732,381 @@ def generate_random_message():
     """Generate a random message."""
     return random.choice(["Coveralls", "Boots", "Hardhat", "Gloves"])
 
+def page_size(data, default):
+    """Read row_count from the request, clamped to 1..MAX_PAGE_SIZE."""
+    try:
+        size = int(data.get('row_count', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, app.config['MAX_PAGE_SIZE']))
+
+def stream_limit(data, default):
+    """Read row_count for an NDJSON stream: default when not given, None for "all".
+
+    Raises ValueError for anything else that is not a positive integer, so the route can
+    answer 400 before the stream starts.
+    """
+    value = data.get('row_count', default)
+    if value == 'all':
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError('Invalid row_count')
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError('Invalid row_count')
+    if limit < 1:
+        raise ValueError('Invalid row_count')
+    return limit
+
+def encode_cursor(item):
+    """Opaque token for the (event_time, analytics_id) position of the last row on a page."""
+    event_time = item.event_time.isoformat() if item.event_time else None
+    raw = json.dumps([event_time, item.analytics_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token):
+    """Inverse of encode_cursor; returns None for the first page, raises ValueError if malformed."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        event_time, analytics_id = json.loads(raw)
+        return (datetime.fromisoformat(event_time) if event_time else None), int(analytics_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def keyset_queries(query, after):
+    """Queries for the analytics rows past the cursor position, newest first, to be read in turn.
+
+    Rows are ordered by (event_time DESC, analytics_id DESC). Timestamped rows come from a
+    row-value comparison the event_time indexes answer with a range seek, so a deep page
+    costs the same as the first one. Legacy rows without an event_time sort after all of
+    them; they are a second query, only read once the first one runs out.
+    """
+    untimed = query.filter(Analytics.event_time.is_(None))
+    if after is not None and after[0] is None:
+        return [untimed.filter(Analytics.analytics_id < after[1]).order_by(Analytics.analytics_id.desc())]
+    if after is None:
+        timed = query.filter(Analytics.event_time.isnot(None))
+    else:
+        timed = query.filter(tuple_(Analytics.event_time, Analytics.analytics_id) < tuple_(
+            literal(after[0], Analytics.event_time.type), literal(after[1], Analytics.analytics_id.type)))
+    return [
+        timed.order_by(Analytics.event_time.desc(), Analytics.analytics_id.desc()),
+        untimed.order_by(Analytics.analytics_id.desc()),
+    ]
+
+def keyset_rows(query, after, limit):
+    """Up to limit rows past the cursor, reading the keyset_queries() in turn."""
+    rows = []
+    for segment in keyset_queries(query, after):
+        rows += segment.limit(limit - len(rows)).all()
+        if len(rows) >= limit:
+            break
+    return rows
+
+def keyset_stream(query, after, batch_size):
+    """Every row past the cursor, fetched batch_size at a time; each query runs only when reached."""
+    return chain.from_iterable(segment.yield_per(batch_size) for segment in keyset_queries(query, after))
+
+def keyset_sort_key(item):
+    """Sort key matching keyset_queries()' order when reversed; rows without an event_time rank last."""
+    return (item.event_time is not None, item.event_time or datetime.min, item.analytics_id)
+
+def keyset_page(build_query, after, limit):
+    """Return one page of analytics rows plus the cursor for the next page.
+
+    build_query(query, use_fts) applies the route's filters to a base Analytics query.
+    Monthly partitions are visited newest first, and only while one could still hold
+    rows for this page, so a page of recent rows never opens one.
+    """
+    rows = keyset_rows(build_query(Analytics.query, True), after, limit + 1)
+    for partition in analytics_partitions(db.session):
+        month_start, month_end = month_bounds(partition.month)
+        if after is not None and (after[0] is None or after[0] < month_start):
+            continue  # the whole month sorts before the cursor
+        if len(rows) > limit and rows[limit].event_time is not None and rows[limit].event_time >= month_end:
+            break  # this month and every older one sort after the page
+        with Session(bind=partition_engine(partition.path)) as session:
+            rows += keyset_rows(build_query(session.query(Analytics), False), after, limit + 1)
+        rows = sorted(rows, key=keyset_sort_key, reverse=True)[:limit + 1]
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def media_response_path(value):
+    """media_path() with forward slashes, as returned to clients."""
+    if not value:
+        return value
+    if is_content_key(value):
+        root = app.config['UPLOAD_FOLDER'].replace('\\', '/')
+        return f"{root}/media/{value[:2]}/{value[2:4]}/{value}"
+    return value.replace('\\', '/')
+
+analytics_serializer = ModelSerializer(
+    Analytics,
+    ('analytics_id', 'log_image', 'log_video', 'create_date', 'event_time', 'message', 'camera_id',
+     'camera_location', 'action', 'time_to_action', 'status', 'user_id', 'thumb_url'),
+    converters={
+        'log_image': media_response_path,
+        'log_video': media_response_path,
+        'event_time': lambda value: value and str(value),
+        'thumb_url': lambda value: thumbnail_url(value),
+    },
+)
+# Response shape of the analytics list routes when no fields= is given
+ANALYTICS_LIST_FIELDS = ('log_image', 'log_video', 'create_date', 'message', 'camera_id',
+                         'camera_location', 'action', 'status', 'user_id', 'thumb_url')
+
+def project_analytics(query, names):
+    """Project an analytics query onto names plus the columns keyset pagination needs."""
+    extra = [column for column in (Analytics.event_time, Analytics.analytics_id) if column.key not in names]
+    return analytics_serializer.project(query, names, *extra)
+
+def wants_ndjson():
+    """True when the client explicitly prefers newline-delimited JSON over a JSON document."""
+    best = request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson'])
+    return best == 'application/x-ndjson'
+
+def stream_analytics(build_query, after, names, limit=None):
+    """Stream matching rows as NDJSON straight off a server-side cursor.
+
+    Rows are pulled STREAM_BATCH_SIZE at a time with yield_per and written out
+    one line each, so memory stays flat and the first line goes out before the
+    query has finished. Monthly partitions are merged in keyset order. limit is
+    an already validated stream_limit(); None streams every matching row.
+    """
+    batch_size = app.config['STREAM_BATCH_SIZE']
+    partitions = [partition for partition in analytics_partitions(db.session)
+                  if after is None or (after[0] is not None and month_bounds(partition.month)[0] <= after[0])]
+
+    def generate():
+        dumps = app.json.dumps
+        with ExitStack() as stack:
+            sources = [keyset_stream(build_query(Analytics.query, True), after, batch_size)]
+            for partition in partitions:
+                session = stack.enter_context(Session(bind=partition_engine(partition.path)))
+                sources.append(keyset_stream(build_query(session.query(Analytics), False), after, batch_size))
+            rows = heapq.merge(*sources, key=keyset_sort_key, reverse=True) if partitions else sources[0]
+            if limit is not None:
+                rows = islice(rows, limit)
+            for item in analytics_serializer.iter_dicts(rows, names):
+                yield dumps(item) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+# Full-text search: an external-content FTS5 table over the searchable text columns.
+# The trigram tokenizer keeps the old LIKE '%term%' substring semantics for terms of
+# three or more characters; shorter terms fall back to LIKE on the matched rows.
+FTS_COLUMNS = ('message', 'camera_id', 'action', 'status')
+FTS_MIN_TERM_LENGTH = 3
+
+def create_fts_index():
+    """Create the analytics_fts shadow table and its sync triggers.
+
+    The index is rebuilt from analytics whenever the triggers are missing (first run, or
+    the analytics table was recreated), since writes in between were not mirrored.
+    """
+    cols = ', '.join(FTS_COLUMNS)
+    new_cols = ', '.join(f'new.{c}' for c in FTS_COLUMNS)
+    old_cols = ', '.join(f'old.{c}' for c in FTS_COLUMNS)
+    with db.engine.begin() as conn:
+        in_sync = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'analytics_fts_ai'"
+        )).first()
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS analytics_fts USING fts5("
+            f"{cols}, content='analytics', content_rowid='analytics_id', tokenize='trigram')"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS analytics_fts_ai AFTER INSERT ON analytics BEGIN "
+            f"INSERT INTO analytics_fts(rowid, {cols}) VALUES (new.analytics_id, {new_cols}); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS analytics_fts_ad AFTER DELETE ON analytics BEGIN "
+            f"INSERT INTO analytics_fts(analytics_fts, rowid, {cols}) VALUES ('delete', old.analytics_id, {old_cols}); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS analytics_fts_au AFTER UPDATE OF {cols} ON analytics BEGIN "
+            f"INSERT INTO analytics_fts(analytics_fts, rowid, {cols}) VALUES ('delete', old.analytics_id, {old_cols}); "
+            f"INSERT INTO analytics_fts(rowid, {cols}) VALUES (new.analytics_id, {new_cols}); END"
+        ))
+        if not in_sync:
+            conn.execute(text("INSERT INTO analytics_fts(analytics_fts) VALUES ('rebuild')"))
+
+def fts_match_expression(terms):
+    """Build an FTS5 MATCH string from {column: term}, skipping terms too short for trigrams."""
+    clauses = []
+    for column, term in terms.items():
+        if term and len(str(term)) >= FTS_MIN_TERM_LENGTH:
+            clauses.append('%s : "%s"' % (column, str(term).replace('"', '""')))
+    return ' AND '.join(clauses)
+
+def filter_text_terms(query, terms, use_fts=True):
+    """Apply substring filters for message/camera_id/action/status.
+
+    Terms long enough for the trigram index go through a single FTS5 MATCH, so
+    the work is proportional to the number of matches; anything else keeps the
+    LIKE filter, which then only runs over rows that survived the MATCH.
+    use_fts=False (monthly partitions have no FTS index) filters with LIKE only.
+    """
+    match = fts_match_expression(terms) if use_fts and app.config['SEARCH_USE_FTS'] else ''
+    if match:
+        matched_ids = text("SELECT rowid FROM analytics_fts WHERE analytics_fts MATCH :match").bindparams(match=match)
+        query = query.filter(Analytics.analytics_id.in_(matched_ids.columns(rowid=db.Integer)))
+    for column, term in terms.items():
+        if term and not (match and len(str(term)) >= FTS_MIN_TERM_LENGTH):
+            query = query.filter(getattr(Analytics, column).like(f"%{term}%"))
+    return query
+
+BATCH_TEXT_FIELDS = ('user_id', 'log_image', 'log_video', 'message', 'camera_id',
+                     'camera_location', 'action', 'time_to_action', 'status')
+
+def validate_analytics_event(event):
+    """Turn one /analytics-batch item into an Analytics row dict; returns (row, error)."""
+    if not isinstance(event, dict):
+        return None, 'Event must be an object'
+    for field in ('user_id', 'camera_id'):
+        if not event.get(field):
+            return None, f'{field} is required'
+    row = {}
+    for field in BATCH_TEXT_FIELDS:
+        value = event.get(field)
+        if value is not None:
+            value = str(value)
+            if len(value) > 255:
+                return None, f'{field} is longer than 255 characters'
+        row[field] = value
+    row['status'] = row['status'] or 'Action Received'
+
+    if event.get('create_date'):
+        event_time = parse_event_time(event['create_date'])
+        if event_time is None:
+            return None, 'create_date is not a recognised date'
+    else:
+        event_time = datetime.now()
+    row['create_date'] = str(event_time)
+    row['event_time'] = event_time
+    return row, None
+
+def insert_analytics_rows(rows):
+    """Insert Analytics row dicts with one multi-row statement and update the derived counters.
+
+    Returns the new analytics_ids in input order. The caller owns the transaction.
+    """
+    stmt = insert(Analytics).returning(Analytics.analytics_id, sort_by_parameter_order=True)
+    new_ids = db.session.scalars(stmt, rows).all()
+    bump_dashboard_counters([(row['event_time'], row['status']) for row in rows])
+    bump_analytics_rollups([(row['event_time'], row['camera_id'], row.get('message'), row['status']) for row in rows])
+    bump_media_refs([key for row in rows for key in (row.get('log_image'), row.get('log_video'))])
+    return new_ids
+
+def release_analytics_rows(rows):
+    """Update derived state for analytics rows deleted in the current transaction."""
+    bump_dashboard_counters([(row.event_time, row.status) for row in rows], sign=-1)
+    bump_analytics_rollups([(row.event_time, row.camera_id, row.message, row.status) for row in rows], sign=-1)
+    bump_media_refs([key for row in rows for key in (row.log_image, row.log_video)], sign=-1)
+
+class AnalyticsWriteQueue:
+    """Write-behind queue that group-commits Analytics inserts from a dedicated thread.
+
+    Requests hand over a row dict and return immediately; the writer drains up to
+    WRITE_BEHIND_MAX_BATCH rows (waiting at most WRITE_BEHIND_FLUSH_INTERVAL for a
+    batch to fill) and commits them in one transaction. A failed commit is retried with
+    backoff, then the rows go in one transaction each, so one bad row only loses itself.
+    The queue is bounded, so a writer that falls behind pushes back on requests instead
+    of growing without limit. Events still queued when the process is killed are lost;
+    a clean exit drains them.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._queue = None
+        self._thread = None
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self._queue is None:
+                    self._queue = queue.Queue(maxsize=self.app.config['WRITE_BEHIND_MAX_QUEUE'])
+                self._thread = threading.Thread(target=self._run, name='analytics-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, row):
+        """Queue one row dict; raises queue.Full if the writer cannot keep up."""
+        self._ensure_started()
+        self._queue.put(row, timeout=self.app.config['WRITE_BEHIND_PUT_TIMEOUT'])
+
+    def flush(self):
+        """Block until every queued row has been committed (or failed)."""
+        if self._queue is not None:
+            self._queue.join()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.app.config['WRITE_BEHIND_FLUSH_INTERVAL']
+        while len(batch) < self.app.config['WRITE_BEHIND_MAX_BATCH']:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _insert(self, rows):
+        try:
+            insert_analytics_rows(rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def _commit_batch(self, batch):
+        delay = self.app.config['WRITE_BEHIND_RETRY_DELAY']
+        for attempt in range(self.app.config['WRITE_BEHIND_RETRIES'] + 1):
+            if attempt:
+                time.sleep(delay)
+                delay *= 2
+            try:
+                self._insert(batch)
+                return
+            except Exception as e:
+                self.app.logger.warning('Group commit of %d analytics rows failed (attempt %d): %s',
+                                        len(batch), attempt + 1, e)
+        for row in batch:
+            try:
+                self._insert([row])
+            except Exception:
+                self.app.logger.exception('Dropped queued analytics row %r', row)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                with self.app.app_context():
+                    self._commit_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+analytics_writer = AnalyticsWriteQueue(app)
+
+def save_analytics_row(row):
+    """Persist one Analytics row dict, through the write-behind queue when it is enabled.
+
+    Returns True if the row was queued rather than committed.
+    """
+    if app.config['WRITE_BEHIND_ENABLED']:
+        analytics_writer.submit(row)
+        return True
+    insert_analytics_rows([row])
+    db.session.commit()
+    return False
+
 def allowed_file(filename):
     """Check if file has allowed extension."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
@@ -165,33 +1124,35 @@ def fileupload(directory):
 def analytics_action():                                                
     """Handle analytics actions with image and video uploads."""
     try:
-        if 'image' not in request.files or 'video' not in request.files:
-            return jsonify({'status': 'error', 'message': 'Image or video file not provided'}), 400
-
-        image_file = request.files['image']
-        video_file = request.files['video']
-
-        if image_file.filename == '' or video_file.filename == '':
-            return jsonify({'status': 'error', 'message': 'No selected files'}), 400
-
-        image_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'images')
-        video_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'videos')
+        image_upload_id = request.form.get('image_upload_id')
+        video_upload_id = request.form.get('video_upload_id')
+        if image_upload_id or video_upload_id:
+            # Media already sent through /upload-init, /upload-chunk and /upload-complete
+            image_key = completed_upload_key(image_upload_id)
+            video_key = completed_upload_key(video_upload_id)
+            if not image_key or not video_key:
+                return jsonify({'status': 'error', 'message': 'Upload not found or not completed'}), 400
+        else:
+            if 'image' not in request.files or 'video' not in request.files:
+                return jsonify({'status': 'error', 'message': 'Image or video file not provided'}), 400
 
-        os.makedirs(image_dir, exist_ok=True)
-        os.makedirs(video_dir, exist_ok=True)
+            image_file = request.files['image']
+            video_file = request.files['video']
 
-        image_path = os.path.join(image_dir, secure_filename(image_file.filename))
-        video_path = os.path.join(video_dir, secure_filename(video_file.filename))
+            if image_file.filename == '' or video_file.filename == '':
+                return jsonify({'status': 'error', 'message': 'No selected files'}), 400
 
-        image_file.save(image_path)
-        video_file.save(video_path)
+            image_key = store_media_stream(image_file.stream, image_file.filename)
+            video_key = store_media_stream(video_file.stream, video_file.filename)
 
         user_id = request.form.get('user_id', 'default_user')  # Default user_id if not provided
 
-        new_action = Analytics(
-            log_image=image_path,
-            log_video=video_path,
-            create_date=str(datetime.now()),
+        now = datetime.now()
+        new_action = dict(
+            log_image=image_key,
+            log_video=video_key,
+            create_date=str(now),
+            event_time=now,
             message=generate_random_message(),
             camera_id=generate_random_camera(),
             camera_location="Location A",
@@ -199,16 +1160,17 @@ def analytics_action():
             status="Action Received",
             user_id=user_id  # Include user_id
         )
-        db.session.add(new_action)
-        db.session.commit()
+        queued = save_analytics_row(new_action)
 
         return jsonify({
             'status': 'success',
-            'message': 'Action added successfully',
-            'log_image': image_path.replace('\\', '/'),
-            'log_video': video_path.replace('\\', '/')
-        })
+            'message': 'Action queued successfully' if queued else 'Action added successfully',
+            'log_image': media_path(image_key).replace('\\', '/'),
+            'log_video': media_path(video_key).replace('\\', '/')
+        }), 202 if queued else 200
 
+    except queue.Full:
+        return jsonify({'status': 'error', 'message': 'Write queue is full, retry later'}), 503
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -228,10 +1190,12 @@ def analytics_insertinto():
 
         user_id = request.form.get('user_id', 'testuser_02')  # Default user_id if not provided
 
-        new_record = Analytics(
+        now = datetime.now()
+        new_record = dict(
             log_image=log_image,
             log_video=log_video,
-            create_date=str(datetime.now()),
+            create_date=str(now),
+            event_time=now,
             message=generate_random_message(),
             camera_id=generate_random_camera(),
             camera_location="Location B",
@@ -239,17 +1203,62 @@ def analytics_insertinto():
             status="Active",
             user_id=user_id  # Include user_id
         )
-        db.session.add(new_record)
-        db.session.commit()
+        queued = save_analytics_row(new_record)
 
         return jsonify({
             'status': 'success',
-            'message': 'Record inserted successfully',
+            'message': 'Record queued successfully' if queued else 'Record inserted successfully',
             'log_image': log_image.replace('\\', '/'),
             'log_video': log_video.replace('\\', '/')
+        }), 202 if queued else 200
+
+    except queue.Full:
+        return jsonify({'status': 'error', 'message': 'Write queue is full, retry later'}), 503
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@app.route('/analytics-batch', methods=['POST'])
+def analytics_batch():
+    """Insert many analytics events in one transaction and report a result per item."""
+    try:
+        data = request.get_json()
+        events = data.get('events') if isinstance(data, dict) else data
+        token = data.get('token', app.config['JWT_SECRET_KEY']) if isinstance(data, dict) else app.config['JWT_SECRET_KEY']
+
+        if token != app.config['JWT_SECRET_KEY']:
+            return jsonify({'status': 'error', 'message': 'Invalid token'}), 401
+        if not isinstance(events, list) or not events:
+            return jsonify({'status': 'error', 'message': 'Expected a non-empty list of events'}), 400
+        if len(events) > app.config['MAX_BATCH_SIZE']:
+            return jsonify({'status': 'error', 'message': f"At most {app.config['MAX_BATCH_SIZE']} events per batch"}), 413
+
+        results = [None] * len(events)
+        rows, positions = [], []
+        for index, event in enumerate(events):
+            row, error = validate_analytics_event(event)
+            if error:
+                results[index] = {'index': index, 'status': 'error', 'message': error}
+            else:
+                rows.append(row)
+                positions.append(index)
+
+        if rows:
+            # One multi-row INSERT ... RETURNING for the whole batch, one commit
+            new_ids = insert_analytics_rows(rows)
+            db.session.commit()
+            for index, analytics_id in zip(positions, new_ids):
+                results[index] = {'index': index, 'status': 'success', 'analytics_id': analytics_id}
+
+        return jsonify({
+            'status': 'success',
+            'inserted': len(rows),
+            'failed': len(events) - len(rows),
+            'results': results
         })
 
     except Exception as e:
+        db.session.rollback()
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
@@ -270,110 +1279,371 @@ def analytics_search():
         status = data.get('status')
         user_id = data.get('user_id')  # Get user_id from the request
 
-        # Start the query
-        query = Analytics.query
-
-        # Filter based on provided search parameters
-        if message:
-            query = query.filter(Analytics.message.like(f"%{message}%"))
-        if camera_id:
-            query = query.filter(Analytics.camera_id.like(f"%{camera_id}%"))
-        if action:
-            query = query.filter(Analytics.action.like(f"%{action}%"))
-        if status:
-            query = query.filter(Analytics.status.like(f"%{status}%"))
-        if user_id:  # Add filter for user_id
-            query = query.filter(Analytics.user_id == user_id)
-
-        # Get the search results
-        search_results = query.all()
+        try:
+            after = decode_cursor(data.get('cursor'))
+        except ValueError:
+            return jsonify({'status': 'error', 'message': 'Invalid cursor'}), 400
+        try:
+            fields = analytics_serializer.parse_fields(requested_fields(data), ANALYTICS_LIST_FIELDS)
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+
+        def build_query(query, use_fts):
+            # Filter based on provided search parameters: text terms via the FTS index,
+            # exact matches on their regular columns
+            query = filter_text_terms(query, {
+                'message': message,
+                'camera_id': camera_id,
+                'action': action,
+                'status': status,
+            }, use_fts)
+            if user_id:  # Add filter for user_id
+                query = query.filter(Analytics.user_id == user_id)
+            return project_analytics(query, fields)
+
+        if wants_ndjson():
+            try:
+                limit = stream_limit(data, app.config['DEFAULT_PAGE_SIZE'])
+            except ValueError as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 400
+            return stream_analytics(build_query, after, fields, limit)
+
+        # Get one page of search results
+        search_results, next_cursor = keyset_page(build_query, after, page_size(data, app.config['DEFAULT_PAGE_SIZE']))
 
         # Return the search results
-        response_data = [
-            {
-                'log_image': item.log_image.replace('\\', '/'),
-                'log_video': item.log_video.replace('\\', '/'),
-                'create_date': item.create_date,
-                'message': item.message,
-                'camera_id': item.camera_id,
-                'camera_location': item.camera_location,
-                'action': item.action,
-                'status': item.status,
-                'user_id': item.user_id  # Include user_id in the response
-            }
-            for item in search_results
-        ]
+        response_data = analytics_serializer.to_dicts(search_results, fields)
 
         return jsonify({
             'status': 'success',
-            'data': response_data
+            'data': response_data,
+            'next_cursor': next_cursor
         })
 
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+########################################### report jobs ####################################################
+# /analytics-report queues a job and returns its id. Rendering runs on a bounded
+# process pool (spawn context, so it behaves the same on Windows and Linux and never
+# forks a threaded server); the worker opens its own engine and records progress in
+# ReportJob, so any API process can answer status and download requests.
+
+_report_pool = None
+_report_pool_lock = threading.Lock()
+_report_futures = {}  # job_id -> future, for jobs this process submitted and that have not finished
+
+def report_folder():
+    folder = app.config['REPORT_FOLDER'] or os.path.join(app.config['UPLOAD_FOLDER'], 'reports')
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+def report_pool():
+    global _report_pool
+    with _report_pool_lock:
+        if _report_pool is None:
+            _report_pool = ProcessPoolExecutor(
+                max_workers=app.config['REPORT_WORKERS'],
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _report_pool
+
+REPORT_CSV_COLUMNS = ('analytics_id', 'user_id', 'message', 'create_date', 'camera_id',
+                      'camera_location', 'action', 'status')
+
+def draw_report_pdf(rows, pdf_path, start_date, end_date):
+    """Draw the analytics report table for an iterable of analytics rows.
+
+    rows is consumed lazily; finished pages are kept compressed by reportlab until save().
+    """
+    c = canvas.Canvas(pdf_path, pagesize=letter, pageCompression=1)
+    c.setFont("Helvetica", 12)
+    c.drawString(100, 750, "Analytics Report")
+    c.drawString(100, 730, f"Date Range: {start_date} to {end_date}")
+    c.drawString(100, 710, "Generated On: " + datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
+    # Table headers
+    y_position = 680
+    c.drawString(50, y_position, "ID")
+    c.drawString(100, y_position, "User ID")
+    c.drawString(200, y_position, "Message")
+    c.drawString(300, y_position, "Date")
+    c.drawString(450, y_position, "Camera Location")
+    c.drawString(550, y_position, "Status")
+
+    # Table rows
+    y_position -= 20
+    for item in rows:
+        if y_position < 50:  # Start a new page if the content exceeds
+            c.showPage()
+            y_position = 750
+
+        c.drawString(50, y_position, str(item.analytics_id))
+        c.drawString(100, y_position, item.user_id)
+        c.drawString(200, y_position, (item.message or '')[:30])  # Truncate message for space
+        c.drawString(280, y_position, item.create_date or '')
+        c.drawString(450, y_position, item.camera_location or '')
+        c.drawString(550, y_position, item.status)
+        y_position -= 20
+
+    c.save()
+
+def render_report_job(database_uri, job_id, start_date, end_date, pdf_path, fetch_size=2000):
+    """Report worker entry point: render one job and record the outcome in ReportJob."""
+    engine = create_engine(database_uri)
+    jobs = ReportJob.__table__
+    analytics = Analytics.__table__
+    try:
+        with engine.begin() as conn:
+            conn.execute(jobs.update().where(jobs.c.job_id == job_id).values(state="running", worker_pid=os.getpid()))
+
+        # Index range scans on event_time, fetched REPORT_FETCH_SIZE rows at a time
+        range_start, range_end = date_range_bounds(start_date, end_date)
+        with engine.connect() as conn:
+            rows = analytics_range_rows(conn, analytics.c.keys(), range_start, range_end, fetch_size)
+            with closing(rows):
+                draw_report_pdf(rows, pdf_path, start_date, end_date)
+        outcome = {"state": "done", "file_path": pdf_path, "file_size": os.path.getsize(pdf_path)}
+    except Exception as e:
+        outcome = {"state": "failed", "error": str(e)}
+
+    with engine.begin() as conn:
+        conn.execute(jobs.update().where(jobs.c.job_id == job_id).values(finished_at=datetime.now(), **outcome))
+    engine.dispose()
+    return outcome["state"]
+
+def process_alive(pid):
+    """Whether a process on this host is still running. Windows has no harmless probe
+    (os.kill terminates there), so it only reports a missing pid as gone."""
+    if not pid:
+        return False
+    if os.name == 'nt':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # exists, owned by another user
+    return True
+
+def fail_orphaned_report_jobs():
+    """Fail queued or running jobs whose process is gone or that are older than
+    REPORT_JOB_TIMEOUT; returns how many. Left alone they count toward REPORT_MAX_PENDING
+    forever, e.g. after a restart or a killed pool."""
+    cutoff = datetime.now() - timedelta(seconds=app.config['REPORT_JOB_TIMEOUT'])
+    orphaned = 0
+    for job in ReportJob.query.filter(ReportJob.state.in_(("queued", "running"))):
+        if job.created_at < cutoff:
+            job.error = "Report timed out"
+        elif not process_alive(job.worker_pid):
+            job.error = "Report worker stopped"
+        else:
+            continue
+        job.state = "failed"
+        job.finished_at = datetime.now()
+        orphaned += 1
+    db.session.commit()
+    return orphaned
+
+def report_job_alive(job):
+    """Whether a queued or running job can still finish: this process holds its unfinished
+    future, or it is younger than REPORT_JOB_TIMEOUT and its process is still running."""
+    future = _report_futures.get(job.job_id)
+    if future is not None and not future.done():
+        return True
+    cutoff = datetime.now() - timedelta(seconds=app.config['REPORT_JOB_TIMEOUT'])
+    return job.created_at >= cutoff and process_alive(job.worker_pid)
+
+def _report_job_finished(job_id, future):
+    """Mark a job failed if its worker died before it could record the outcome itself."""
+    _report_futures.pop(job_id, None)
+    if future.exception() is None:
+        return
+    with app.app_context():
+        ReportJob.query.filter(
+            ReportJob.job_id == job_id,
+            ReportJob.state.in_(("queued", "running")),
+        ).update({"state": "failed", "error": str(future.exception()), "finished_at": datetime.now()})
+        db.session.commit()
+
+def analytics_range_rows(conn, columns, range_start, range_end, fetch_size):
+    """Yield analytics rows with event_time in [range_start, range_end), oldest first.
+
+    Rows come from the analytics table on conn merged with every monthly partition
+    overlapping the range. Each row holds columns, plus event_time last if columns lacks it.
+    """
+    table = Analytics.__table__
+    selected = [table.c[name] for name in columns]
+    if 'event_time' not in columns:
+        selected.append(table.c.event_time)
+    stmt = select(*selected).where(
+        table.c.event_time >= range_start, table.c.event_time < range_end,
+    ).order_by(table.c.event_time)
+    partitions = analytics_partitions(conn, range_start, range_end)
+    with ExitStack() as stack:
+        sources = [conn.execution_options(yield_per=fetch_size).execute(stmt)]
+        for partition in reversed(partitions):
+            partition_conn = stack.enter_context(partition_engine(partition.path).connect())
+            sources.append(partition_conn.execution_options(yield_per=fetch_size).execute(stmt))
+        yield from heapq.merge(*sources, key=lambda row: row.event_time) if partitions else sources[0]
+
+def stream_report_csv(range_start, range_end, filename):
+    """Stream the report rows as CSV straight to the response in bounded memory."""
+    width = len(REPORT_CSV_COLUMNS)
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(REPORT_CSV_COLUMNS)
+        with db.engine.connect() as conn, closing(analytics_range_rows(
+                conn, REPORT_CSV_COLUMNS, range_start, range_end, app.config['REPORT_FETCH_SIZE'])) as rows:
+            for row in rows:
+                writer.writerow(row[:width])
+                if buffer.tell() >= 64 * 1024:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+        yield buffer.getvalue()
+
+    return Response(stream_with_context(generate()), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+def report_cache_key(range_start, range_end, filters, version):
+    """Cache key for a rendered report: normalized range, filters and the range's data version."""
+    raw = json.dumps([range_start.isoformat(), range_end.isoformat(), filters, version], sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def evict_report_cache():
+    """Expire cached reports older than REPORT_CACHE_MAX_AGE, then least recently used
+    ones until the total size fits in REPORT_CACHE_MAX_BYTES."""
+    cutoff = datetime.now() - timedelta(seconds=app.config['REPORT_CACHE_MAX_AGE'])
+    last_used = func.coalesce(ReportJob.last_used_at, ReportJob.finished_at)
+    total_size = 0
+    for job in ReportJob.query.filter(ReportJob.state == "done").order_by(last_used.desc()):
+        total_size += job.file_size or 0
+        if (job.last_used_at or job.finished_at) < cutoff or total_size > app.config['REPORT_CACHE_MAX_BYTES']:
+            if job.file_path and os.path.exists(job.file_path):
+                os.remove(job.file_path)
+            job.state = "expired"
+            job.file_path = None
+    db.session.commit()
+
+def report_job_to_dict(job):
+    result = {
+        'job_id': job.job_id,
+        'state': job.state,
+        'start_date': job.start_date,
+        'end_date': job.end_date,
+        'created_at': str(job.created_at),
+        'finished_at': job.finished_at and str(job.finished_at),
+        'error': job.error,
+    }
+    if job.state == 'done':
+        result['pdf_path'] = job.file_path
+        result['download_url'] = url_for('analytics_report_download', job_id=job.job_id)
+    return result
+
 @app.route('/analytics-report', methods=['POST'])
 def analytics_report():
-    """Generate a report of analytics data within a date range and save as a PDF."""
+    """Queue a PDF report of analytics data within a date range; returns a job id to poll.
+
+    With "format": "csv" the report is streamed back directly instead.
+    A PDF for a range whose data has not changed since an earlier job reuses that job.
+    """
     try:
         data = request.get_json()
         start_date = data.get('start_date')
         end_date = data.get('end_date')
-
-        # Fetch analytics data within the date range
-        report_data = Analytics.query.filter(Analytics.create_date.between(start_date, end_date)).all()
-
-        # Directory to save the PDF
-        pdf_dir = r"D:/Projects_ITech/ai.cam_github_repositories/AnalyticsDashboardAPI/api/benchmarkdata/uploads" ### change path of pdfs folder to your actual path  ##############
-        os.makedirs(pdf_dir, exist_ok=True)
+        report_format = data.get('format')
+        report_format = 'pdf' if report_format is None else report_format
+
+        try:
+            range_start, range_end = date_range_bounds(start_date, end_date)
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+        if not isinstance(report_format, str) or report_format.lower() not in ('pdf', 'csv'):
+            return jsonify({'status': 'error', 'message': 'format must be pdf or csv'}), 400
+        report_format = report_format.lower()
+
+        if report_format == 'csv':
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            return stream_report_csv(range_start, range_end, f"analytics_report_{timestamp}.csv")
+
+        # Same range, filters and data as an earlier job that is done or can still finish: hand back that job
+        fail_orphaned_report_jobs()
+        cache_key = report_cache_key(range_start, range_end, {}, analytics_range_version(range_start, range_end))
+        cached = ReportJob.query.filter(
+            ReportJob.cache_key == cache_key,
+            ReportJob.state.in_(("queued", "running", "done")),
+        ).order_by(ReportJob.created_at.desc()).first()
+        if cached and (os.path.exists(cached.file_path) if cached.state == "done" else report_job_alive(cached)):
+            cached.last_used_at = datetime.now()
+            db.session.commit()
+            return jsonify({
+                'status': 'success',
+                'message': 'Report served from cache.' if cached.state == "done" else 'Report already queued.',
+                'cached': True,
+                'job': report_job_to_dict(cached),
+                'status_url': url_for('analytics_report_status', job_id=cached.job_id)
+            }), 200
+
+        pending = ReportJob.query.filter(ReportJob.state.in_(("queued", "running"))).count()
+        if pending >= app.config['REPORT_MAX_PENDING']:
+            return jsonify({'status': 'error', 'message': 'Too many reports in progress, retry later'}), 503
+
+        job = ReportJob(job_id=uuid.uuid4().hex, state="queued", start_date=start_date, end_date=end_date,
+                        cache_key=cache_key, worker_pid=os.getpid())
+        db.session.add(job)
+        db.session.commit()
+        evict_report_cache()
 
         # Generate PDF file name
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        pdf_path = os.path.join(pdf_dir, f"analytics_report_{timestamp}.pdf")
-
-        # Create the PDF
-        c = canvas.Canvas(pdf_path, pagesize=letter)
-        c.setFont("Helvetica", 12)
-        c.drawString(100, 750, "Analytics Report")
-        c.drawString(100, 730, f"Date Range: {start_date} to {end_date}")
-        c.drawString(100, 710, "Generated On: " + datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-
-        # Table headers
-        y_position = 680
-        c.drawString(50, y_position, "ID")
-        c.drawString(100, y_position, "User ID")
-        c.drawString(200, y_position, "Message")
-        c.drawString(300, y_position, "Date")
-        c.drawString(450, y_position, "Camera Location")
-        c.drawString(550, y_position, "Status")
-
-        # Table rows
-        y_position -= 20
-        for item in report_data:
-            if y_position < 50:  # Start a new page if the content exceeds
-                c.showPage()
-                y_position = 750
-
-            c.drawString(50, y_position, str(item.analytics_id))
-            c.drawString(100, y_position, item.user_id)
-            c.drawString(200, y_position, item.message[:30])  # Truncate message for space
-            c.drawString(280, y_position, item.create_date)
-            c.drawString(450, y_position, item.camera_location)
-            c.drawString(550, y_position, item.status)
-            y_position -= 20
+        pdf_path = os.path.join(report_folder(), f"analytics_report_{timestamp}_{job.job_id[:8]}.pdf")
 
-        c.save()
+        args = (db.engine.url.render_as_string(hide_password=False), job.job_id, start_date, end_date, pdf_path,
+                app.config['REPORT_FETCH_SIZE'])
+        if app.config['REPORT_WORKERS'] > 0:
+            future = _report_futures[job.job_id] = report_pool().submit(render_report_job, *args)
+            future.add_done_callback(partial(_report_job_finished, job.job_id))
+        else:
+            render_report_job(*args)
+        db.session.refresh(job)
 
         return jsonify({
             'status': 'success',
-            'message': 'Report generated successfully.',
-            'pdf_path': pdf_path
-        })
+            'message': 'Report queued.',
+            'cached': False,
+            'job': report_job_to_dict(job),
+            'status_url': url_for('analytics_report_status', job_id=job.job_id)
+        }), 202
 
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/analytics-report/<job_id>', methods=['GET'])
+def analytics_report_status(job_id):
+    """Poll a report job."""
+    job = db.session.get(ReportJob, job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Report job not found'}), 404
+    return jsonify({'status': 'success', 'job': report_job_to_dict(job)})
+
+@app.route('/analytics-report/<job_id>/download', methods=['GET'])
+def analytics_report_download(job_id):
+    """Download the PDF of a finished report job."""
+    job = db.session.get(ReportJob, job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Report job not found'}), 404
+    if job.state != 'done':
+        return jsonify({'status': 'error', 'message': f'Report is {job.state}'}), 409
+    job.last_used_at = datetime.now()
+    db.session.commit()
+    return send_file(job.file_path, mimetype='application/pdf', as_attachment=True,
+                     download_name=os.path.basename(job.file_path))
+
 @app.route('/analytics-viewall', methods=['POST'])
 def analytics_viewall():
     """View all analytics records with optional filtering."""
@@ -383,33 +1653,37 @@ def analytics_viewall():
         if token != app.config['JWT_SECRET_KEY']:
             return jsonify({'status': 'error', 'message': 'Invalid token'}), 401
 
-        row_count = data.get('row_count', 10)
         analytics_id = data.get('analytics_id')
 
-        query = Analytics.query
-        if analytics_id:
-            query = query.filter(Analytics.analytics_id == analytics_id)
-
-        results = query.limit(row_count).all()
-
-        response_data = [
-            {
-                'log_image': item.log_image.replace('\\', '/'),
-                'log_video': item.log_video.replace('\\', '/'),
-                'create_date': item.create_date,
-                'message': item.message,
-                'camera_id': item.camera_id,
-                'camera_location': item.camera_location,
-                'action': item.action,
-                'status': item.status,
-                'user_id':item.user_id
-            }
-            for item in results
-        ]
+        try:
+            after = decode_cursor(data.get('cursor'))
+        except ValueError:
+            return jsonify({'status': 'error', 'message': 'Invalid cursor'}), 400
+        try:
+            fields = analytics_serializer.parse_fields(requested_fields(data), ANALYTICS_LIST_FIELDS)
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+
+        def build_query(query, use_fts):
+            if analytics_id:
+                query = query.filter(Analytics.analytics_id == analytics_id)
+            return project_analytics(query, fields)
+
+        if wants_ndjson():
+            try:
+                limit = stream_limit(data, 10)
+            except ValueError as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 400
+            return stream_analytics(build_query, after, fields, limit)
+
+        results, next_cursor = keyset_page(build_query, after, page_size(data, 10))
+
+        response_data = analytics_serializer.to_dicts(results, fields)
 
         return jsonify({
             'status': 'success',
-            'data': response_data
+            'data': response_data,
+            'next_cursor': next_cursor
         })
 
     except Exception as e:
@@ -423,10 +1697,8 @@ def analytics_delete():
         data = request.get_json()
         analytics_id = data.get('analytics_id')
 
-        record = Analytics.query.get(analytics_id)
-        if record:
-            db.session.delete(record)
-            db.session.commit()
+        deleted = delete_analytics_where(Analytics.analytics_id == analytics_id)
+        if deleted:
             return jsonify({'status': 'success', 'message': 'Record deleted successfully'})
         else:
             return jsonify({'status': 'error', 'message': 'Record not found'}), 400
@@ -434,19 +1706,841 @@ def analytics_delete():
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+ANALYTICS_DELETE_FILTERS = {
+    name: getattr(Analytics, name) for name in ('user_id', 'camera_id', 'message', 'action', 'status')
+}
+
+def delete_analytics_where(*conditions):
+    """Delete matching analytics rows, archived ones included, and commit; returns the count.
+
+    One DELETE ... RETURNING per database file. The returned rows release their derived
+    state (counters, rollups, media refs) in the main transaction; the partition deletes
+    commit right after it, and roll back with it if it fails.
+    """
+    stmt = delete(Analytics).where(*conditions).returning(
+        Analytics.event_time, Analytics.camera_id, Analytics.message, Analytics.status,
+        Analytics.log_image, Analytics.log_video)
+    deleted = db.session.execute(stmt, execution_options={"synchronize_session": False}).all()
+    release_analytics_rows(deleted)
+    total = len(deleted)
+    with ExitStack() as stack:
+        pending = []
+        for partition in analytics_partitions(db.session):
+            conn = stack.enter_context(partition_engine(partition.path).connect())
+            deleted = conn.execute(stmt).all()
+            if deleted:
+                release_analytics_rows(deleted)
+                db.session.execute(update(AnalyticsPartition).where(AnalyticsPartition.month == partition.month)
+                                   .values(row_count=AnalyticsPartition.row_count - len(deleted)))
+                pending.append(conn)
+                total += len(deleted)
+        db.session.commit()
+        for conn in pending:
+            conn.commit()
+    return total
+
+@app.route('/analytics-delete-bulk', methods=['POST'])
+def analytics_delete_bulk():
+    """Delete analytics records by analytics_ids and/or a filter in one statement.
+
+    The filter matches user_id, camera_id, message, action and status exactly, and
+    start_date/end_date (both required together) select an event_time range.
+    """
+    try:
+        conditions = bulk_delete_conditions(request.get_json() or {}, Analytics.analytics_id,
+                                            ANALYTICS_DELETE_FILTERS, range_column=Analytics.event_time)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    try:
+        deleted = delete_analytics_where(*conditions)
+        return jsonify({'status': 'success', 'deleted': deleted})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 
 @app.route('/analytics-delete-all', methods=['POST'])
 def analytics_delete_all():
     """Delete all analytics records."""
     try:
         Analytics.query.delete()
+        reset_dashboard_counters()
+        AnalyticsRollup.query.delete()
+        MediaObject.query.update({MediaObject.ref_count: 0})
         db.session.commit()
+        clear_analytics_partitions()
         return jsonify({'status': 'success', 'message': 'All records deleted successfully'})
 
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+########################################### media store ####################################################
+# Uploaded media is stored once per content: the SHA-256 of the bytes (computed while
+# streaming to disk) plus the extension is the content key kept in log_image/log_video,
+# and files live under UPLOAD_FOLDER/media/<k[0:2]>/<k[2:4]>/<key> so no directory grows
+# flat. Duplicate uploads are dropped after hashing; MediaObject counts references.
+
+CONTENT_KEY_PATTERN = re.compile(r'[0-9a-f]{64}\.[a-z0-9]+')
+
+def is_content_key(value):
+    return bool(value) and CONTENT_KEY_PATTERN.fullmatch(value) is not None
+
+def media_path(value):
+    """Filesystem path for a content key; legacy rows already hold a path and pass through."""
+    if not is_content_key(value):
+        return value
+    return os.path.join(app.config['UPLOAD_FOLDER'], 'media', value[:2], value[2:4], value)
+
+def content_key_for(digest, filename):
+    extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+    if not re.fullmatch(r'[a-z0-9]{1,10}', extension):
+        extension = 'bin'
+    return f"{digest}.{extension}"
+
+def _commit_media(temp_path, content_key):
+    """Move a hashed temp file to its content path, or drop it if that content is already stored."""
+    final_path = media_path(content_key)
+    try:
+        os.utime(final_path)  # fresh mtime keeps reclaim_unreferenced_media() off it
+        os.remove(temp_path)
+    except FileNotFoundError:  # new content, or just moved aside by reclaim_unreferenced_media()
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(temp_path, final_path)
+        queue_thumbnail(content_key)
+    return content_key
+
+def store_media_stream(stream, filename):
+    """Copy a stream into the media store, hashing as it goes; returns the content key."""
+    temp_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'media', 'tmp')
+    os.makedirs(temp_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    buffer_size = app.config['UPLOAD_BUFFER_SIZE']
+    with tempfile.NamedTemporaryFile(dir=temp_dir, delete=False) as temp:
+        while True:
+            buf = stream.read(buffer_size)
+            if not buf:
+                break
+            digest.update(buf)
+            temp.write(buf)
+    return _commit_media(temp.name, content_key_for(digest.hexdigest(), filename))
+
+def store_media_file(path, filename):
+    """Hash a file already on disk (same filesystem) and move it into the media store."""
+    digest = hashlib.sha256()
+    buffer_size = app.config['UPLOAD_BUFFER_SIZE']
+    with open(path, 'rb') as f:
+        for buf in iter(lambda: f.read(buffer_size), b''):
+            digest.update(buf)
+    return _commit_media(path, content_key_for(digest.hexdigest(), filename))
+
+def bump_media_refs(keys, sign=1):
+    """Add or remove analytics references to stored media, in the caller's transaction."""
+    deltas = {}
+    for key in keys:
+        if is_content_key(key):
+            deltas[key] = deltas.get(key, 0) + sign
+    apply_media_ref_deltas(deltas)
+
+def apply_media_ref_deltas(deltas):
+    """Upsert {content_key: change} into MediaObject.ref_count."""
+    if not deltas:
+        return
+    stmt = sqlite_insert(MediaObject)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MediaObject.content_key],
+        set_={"ref_count": MediaObject.ref_count + stmt.excluded.ref_count},
+    )
+    db.session.execute(stmt, [{"content_key": k, "ref_count": n} for k, n in deltas.items()])
+
+
+########################################### thumbnails ####################################################
+# Every new media file gets a small JPEG preview on a background process pool: a
+# thumbnail for images (Pillow) and a poster frame for videos (ffmpeg). Previews sit
+# next to their content as <key>.thumb.jpg, are served by /media-thumbnail/<key> and
+# linked from the analytics list routes as thumb_url. A preview that is missing (older
+# media, no worker yet, a failed render) is rendered on its first request instead.
+
+app.config['THUMBNAIL_WORKERS'] = 2  # preview render processes; 0 renders inline while storing the upload
+app.config['THUMBNAIL_SIZE'] = (320, 320)  # bounding box in pixels; the aspect ratio is kept
+app.config['THUMBNAIL_QUALITY'] = 80  # JPEG quality
+app.config['FFMPEG_BINARY'] = shutil.which('ffmpeg')  # video posters are skipped when ffmpeg is not installed
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+VIDEO_EXTENSIONS = {'mp4'}
+
+_thumbnail_pool = None
+_thumbnail_pool_lock = threading.Lock()
+
+def thumbnail_pool():
+    global _thumbnail_pool
+    with _thumbnail_pool_lock:
+        if _thumbnail_pool is None:
+            _thumbnail_pool = ProcessPoolExecutor(
+                max_workers=app.config['THUMBNAIL_WORKERS'],
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _thumbnail_pool
+
+def thumbnail_path(content_key):
+    return media_path(content_key) + '.thumb.jpg'
+
+def can_thumbnail(content_key):
+    """True when a preview can be made for this content with the libraries installed."""
+    if not is_content_key(content_key):
+        return False
+    extension = content_key.rsplit('.', 1)[1]
+    if extension in IMAGE_EXTENSIONS:
+        return Image is not None
+    return extension in VIDEO_EXTENSIONS and bool(app.config['FFMPEG_BINARY'])
+
+def thumbnail_url(content_key):
+    return url_for('media_thumbnail', content_key=content_key) if can_thumbnail(content_key) else None
+
+def render_thumbnail(source_path, target_path, size, quality, ffmpeg=None):
+    """Worker entry point: write a JPEG preview of an image or a video's poster frame.
+
+    The preview is written to a temporary name and renamed, so readers never see a
+    partial file.
+    """
+    temp_path = f"{target_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        if source_path.rsplit('.', 1)[-1].lower() in VIDEO_EXTENSIONS:
+            # ffmpeg's thumbnail filter picks a representative frame from the first hundred
+            subprocess.run([
+                ffmpeg, '-v', 'error', '-y', '-i', source_path, '-frames:v', '1', '-vf',
+                f'thumbnail,scale={size[0]}:{size[1]}:force_original_aspect_ratio=decrease',
+                '-q:v', '4', '-f', 'mjpeg', temp_path,
+            ], check=True, timeout=60, stdin=subprocess.DEVNULL)
+        else:
+            with Image.open(source_path) as image:
+                image.draft('RGB', size)  # JPEG: decode at a reduced scale straight away
+                image = ImageOps.exif_transpose(image)
+                image.thumbnail(size)
+                image.convert('RGB').save(temp_path, 'JPEG', quality=quality, optimize=True)
+        os.replace(temp_path, target_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return target_path
+
+def thumbnail_args(content_key):
+    return (media_path(content_key), thumbnail_path(content_key), tuple(app.config['THUMBNAIL_SIZE']),
+            app.config['THUMBNAIL_QUALITY'], app.config['FFMPEG_BINARY'])
+
+def _thumbnail_finished(content_key, future):
+    if future.exception() is not None:
+        app.logger.warning('Preview for %s failed: %s', content_key, future.exception())
+
+def queue_thumbnail(content_key):
+    """Schedule the preview for newly stored content; failures are logged, never raised."""
+    if not can_thumbnail(content_key):
+        return
+    try:
+        if app.config['THUMBNAIL_WORKERS'] > 0:
+            future = thumbnail_pool().submit(render_thumbnail, *thumbnail_args(content_key))
+            future.add_done_callback(partial(_thumbnail_finished, content_key))
+        else:
+            render_thumbnail(*thumbnail_args(content_key))
+    except Exception as e:
+        app.logger.warning('Preview for %s failed: %s', content_key, e)
+
+@app.route('/media-thumbnail/<content_key>', methods=['GET'])
+def media_thumbnail(content_key):
+    """Serve the JPEG preview of stored media, rendering it first if it is missing."""
+    if not can_thumbnail(content_key) or not os.path.exists(media_path(content_key)):
+        return jsonify({'status': 'error', 'message': 'Thumbnail not available'}), 404
+    path = thumbnail_path(content_key)
+    if not os.path.exists(path):
+        try:
+            render_thumbnail(*thumbnail_args(content_key))
+        except Exception as e:
+            app.logger.warning('Preview for %s failed: %s', content_key, e)
+            return jsonify({'status': 'error', 'message': 'Thumbnail not available'}), 404
+    # Content keys never change meaning, so the preview can be cached for good
+    return send_file(path, mimetype='image/jpeg', max_age=365 * 24 * 3600)
+
+########################################### retention ####################################################
+# A background thread deletes analytics rows past their retention period in small
+# batches, then removes media files no analytics row references any more.
+
+app.config['RETENTION_DAYS'] = None  # days analytics rows are kept; None keeps them forever
+app.config['RETENTION_CAMERA_DAYS'] = {}  # per camera_id overrides, e.g. {"Camera1": 30}
+app.config['RETENTION_INTERVAL'] = 3600  # seconds between purge runs; 0 disables the purger thread
+app.config['RETENTION_BATCH_SIZE'] = 1000  # rows deleted per transaction
+app.config['RETENTION_BATCH_PAUSE'] = 0.05  # seconds between batches, so writers get the lock
+app.config['MEDIA_RECLAIM_GRACE'] = 3600  # seconds an unreferenced file is kept after its last upload
+
+def retention_rules(now):
+    """(row filter, cutoff) pairs: one per camera override, then the default for all other cameras."""
+    overrides = app.config['RETENTION_CAMERA_DAYS']
+    rules = [(Analytics.camera_id == camera_id, now - timedelta(days=days))
+             for camera_id, days in overrides.items() if days]
+    if app.config['RETENTION_DAYS']:
+        others = Analytics.camera_id.notin_(list(overrides)) if overrides else true()
+        rules.append((others, now - timedelta(days=app.config['RETENTION_DAYS'])))
+    return rules
+
+def purge_expired_analytics(now=None):
+    """Delete analytics rows older than their retention period; returns the number deleted.
+
+    Each batch is one DELETE of at most RETENTION_BATCH_SIZE ids picked oldest first
+    through the event_time indexes, committed together with the derived counters, so
+    the write lock is only ever held for a short transaction. Rows without an
+    event_time are never purged.
+    """
+    batch_size = app.config['RETENTION_BATCH_SIZE']
+    purged = 0
+    for condition, cutoff in retention_rules(now or datetime.now()):
+        while True:
+            ids = select(Analytics.analytics_id).where(condition, Analytics.event_time < cutoff) \
+                .order_by(Analytics.event_time).limit(batch_size)
+            deleted = db.session.execute(
+                delete(Analytics).where(Analytics.analytics_id.in_(ids)).returning(
+                    Analytics.event_time, Analytics.camera_id, Analytics.message, Analytics.status,
+                    Analytics.log_image, Analytics.log_video),
+                execution_options={"synchronize_session": False},
+            ).all()
+            release_analytics_rows(deleted)
+            db.session.commit()
+            purged += len(deleted)
+            if len(deleted) < batch_size:
+                break
+            time.sleep(app.config['RETENTION_BATCH_PAUSE'])
+    return purged
+
+def reclaim_unreferenced_media():
+    """Remove media files whose ref_count dropped to zero; returns the number removed.
+
+    A file uploaded again within MEDIA_RECLAIM_GRACE is skipped, since a request may be
+    about to reference it; candidates are paged in content_key order so skipped ones
+    never stall the rest. Each file is renamed aside first, so an upload of the same
+    content racing with this re-creates it rather than touching the file being removed.
+    Rows are deleted only if still unreferenced, and their files removed before the
+    commit while the write lock is held; the other files are put back.
+    """
+    grace_cutoff = time.time() - app.config['MEDIA_RECLAIM_GRACE']
+    batch_size = app.config['RETENTION_BATCH_SIZE']
+    reclaimed = 0
+    last_key = ''
+    while True:
+        keys = db.session.scalars(
+            select(MediaObject.content_key)
+            .where(MediaObject.ref_count <= 0, MediaObject.content_key > last_key)
+            .order_by(MediaObject.content_key).limit(batch_size)
+        ).all()
+        db.session.commit()
+        if not keys:
+            return reclaimed
+        last_key = keys[-1]
+        aside = {}  # content_key -> renamed path, or None when the file is already gone
+        for key in keys:
+            path = media_path(key)
+            try:
+                if os.path.getmtime(path) > grace_cutoff:
+                    continue
+                os.replace(path, path + '.reclaim')
+                if os.path.getmtime(path + '.reclaim') > grace_cutoff:
+                    os.replace(path + '.reclaim', path)  # uploaded again just now
+                    continue
+                aside[key] = path + '.reclaim'
+            except FileNotFoundError:  # gone, or left aside by a run that crashed
+                aside[key] = path + '.reclaim' if os.path.exists(path + '.reclaim') else None
+        if aside:
+            removable = db.session.scalars(
+                delete(MediaObject).where(MediaObject.content_key.in_(list(aside)), MediaObject.ref_count <= 0)
+                .returning(MediaObject.content_key),
+                execution_options={"synchronize_session": False},
+            ).all()
+            for key in removable:
+                if aside[key]:
+                    os.remove(aside[key])
+                    reclaimed += 1
+                try:
+                    os.remove(thumbnail_path(key))
+                except FileNotFoundError:
+                    pass
+            for key in set(aside) - set(removable):  # referenced again since it was listed
+                if aside[key]:
+                    os.replace(aside[key], media_path(key))
+            db.session.commit()
+        if len(keys) < batch_size:
+            return reclaimed
+
+class RetentionPurger:
+    """Background thread running purge_expired_analytics(), drop_expired_partitions(),
+    archive_analytics_months(), reclaim_unreferenced_media(), sweep_stale_uploads() and
+    evict_report_cache() every RETENTION_INTERVAL seconds. Started by the first request."""
+
+    def __init__(self, app):
+        self.app = app
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        if self._thread is not None or not self.app.config['RETENTION_INTERVAL']:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='retention-purger', daemon=True)
+                self._thread.start()
+
+    def run_once(self):
+        with self.app.app_context():
+            try:
+                purged = purge_expired_analytics() + drop_expired_partitions()
+                archived = archive_analytics_months()
+                reclaimed = reclaim_unreferenced_media()
+                swept = sweep_stale_uploads()
+                evict_report_cache()  # age-based expiry, also when no new report jobs come in
+                if purged or archived or reclaimed or swept:
+                    self.app.logger.info('Retention: purged %d analytics rows, archived %d, reclaimed %d media files, '
+                                         'swept %d stale uploads', purged, archived, reclaimed, swept)
+            except Exception:
+                db.session.rollback()
+                self.app.logger.exception('Retention purge failed')
+
+    def _run(self):
+        while True:
+            self.run_once()
+            time.sleep(self.app.config['RETENTION_INTERVAL'])
+
+retention_purger = RetentionPurger(app)
+
+@app.before_request
+def start_retention_purger():
+    retention_purger.ensure_started()
+
+########################################### monthly partitions ####################################################
+# Whole months older than ANALYTICS_HOT_MONTHS move out of the analytics table into one
+# SQLite file per month (same table and indexes, no FTS index), so the hot table, its
+# indexes, VACUUM and backups stay the size of the recent data. Reads that reach back
+# into archived months open just the partitions overlapping what they need: the list
+# routes page through them newest first, reports by date range. The counters and
+# rollups behind /dashboard and /analytics-timeseries keep covering archived months.
+# The delete routes reach archived rows too. Dropping a whole month takes one grouped pass
+# over its file to take its rows out of the counters, rollups and media references, then
+# deletes the file.
+
+app.config['ANALYTICS_HOT_MONTHS'] = None  # whole months kept in the analytics table; None never archives
+app.config['ANALYTICS_PARTITION_FOLDER'] = None  # defaults to <instance folder>/analytics_partitions
+
+_partition_engines = {}
+_partition_engines_lock = threading.Lock()
+
+def partition_engine(path):
+    """Engine for one partition file, created on first use and kept for the process."""
+    with _partition_engines_lock:
+        engine = _partition_engines.get(path)
+        if engine is None:
+            engine = _partition_engines[path] = create_engine("sqlite:///" + path)
+        return engine
+
+def partition_path(month):
+    folder = app.config['ANALYTICS_PARTITION_FOLDER'] or os.path.join(app.instance_path, 'analytics_partitions')
+    os.makedirs(folder, exist_ok=True)
+    return os.path.abspath(os.path.join(folder, f"analytics_{month.replace('-', '_')}.db"))
+
+def month_bounds(month):
+    """[start, end) of a YYYY-MM month."""
+    start = datetime.strptime(month, "%Y-%m")
+    return start, datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+def analytics_partitions(executor, range_start=None, range_end=None):
+    """(month, path) of the partitions overlapping [range_start, range_end), newest month first.
+
+    executor is a session or connection, so report workers can use their own engine.
+    """
+    stmt = select(AnalyticsPartition.month, AnalyticsPartition.path).order_by(AnalyticsPartition.month.desc())
+    if range_start is not None:
+        stmt = stmt.where(AnalyticsPartition.month >= range_start.strftime("%Y-%m"))
+    if range_end is not None:
+        stmt = stmt.where(AnalyticsPartition.month <= (range_end - timedelta(microseconds=1)).strftime("%Y-%m"))
+    return executor.execute(stmt).all()
+
+def archive_analytics_months(now=None):
+    """Move every whole month older than ANALYTICS_HOT_MONTHS into its partition; returns rows moved.
+
+    Events that arrive late for an archived month land in the analytics table and are
+    moved along with the next run.
+    """
+    hot_months = app.config['ANALYTICS_HOT_MONTHS']
+    if not hot_months:
+        return 0
+    now = now or datetime.now()
+    months = now.year * 12 + now.month - 1 - hot_months
+    cutoff = datetime(months // 12, months % 12 + 1, 1)
+    archived = 0
+    while True:
+        oldest = db.session.scalar(select(func.min(Analytics.event_time)).where(Analytics.event_time < cutoff))
+        db.session.commit()
+        if oldest is None:
+            return archived
+        moved = archive_analytics_month(oldest.strftime("%Y-%m"))
+        if not moved:
+            return archived
+        archived += moved
+
+def archive_analytics_month(month):
+    """Move one month's rows from analytics into its partition file; returns the number moved.
+
+    The file is ATTACHed to one connection and rows move in RETENTION_BATCH_SIZE batches,
+    each copied and deleted in one transaction, so the write lock is only held briefly.
+    The FTS triggers drop the moved rows from the search index; the counters, rollups
+    and media references are left alone since the rows still exist.
+    """
+    table = Analytics.__table__
+    path = partition_path(month)
+    table.create(partition_engine(path), checkfirst=True)
+    month_start, month_end = month_bounds(month)
+    columns = ', '.join(f'"{column.name}"' for column in table.columns)
+    copy_rows = text(
+        f"INSERT OR IGNORE INTO archive.analytics ({columns}) "
+        f"SELECT {columns} FROM main.analytics WHERE analytics_id IN :ids"
+    ).bindparams(bindparam('ids', expanding=True))
+    batch_size = app.config['RETENTION_BATCH_SIZE']
+    moved = 0
+    with db.engine.connect() as conn:
+        conn.exec_driver_sql("ATTACH DATABASE ? AS archive", (path,))
+        try:
+            while True:
+                ids = conn.execute(
+                    select(table.c.analytics_id).where(
+                        table.c.event_time >= month_start, table.c.event_time < month_end,
+                    ).limit(batch_size)
+                ).scalars().all()
+                if ids:
+                    conn.execute(copy_rows, {"ids": ids})
+                    conn.execute(delete(table).where(table.c.analytics_id.in_(ids)))
+                    stmt = sqlite_insert(AnalyticsPartition).values(month=month, path=path, row_count=len(ids))
+                    conn.execute(stmt.on_conflict_do_update(
+                        index_elements=[AnalyticsPartition.month],
+                        set_={"path": path, "row_count": AnalyticsPartition.row_count + len(ids)},
+                    ))
+                conn.commit()
+                moved += len(ids)
+                if len(ids) < batch_size:
+                    return moved
+                time.sleep(app.config['RETENTION_BATCH_PAUSE'])
+        finally:
+            conn.rollback()
+            conn.exec_driver_sql("DETACH DATABASE archive")
+
+def media_ref_totals(executor):
+    """{content_key: references} over the analytics table of a session or connection."""
+    totals = {}
+    for column in (Analytics.log_image, Analytics.log_video):
+        for key, count in executor.execute(select(column, func.count()).where(column.isnot(None)).group_by(column)):
+            if is_content_key(key):
+                totals[key] = totals.get(key, 0) + count
+    return totals
+
+def remove_partition_file(path):
+    engine = _partition_engines.pop(path, None)
+    if engine is not None:
+        engine.dispose()
+    for name in (path, path + '-wal', path + '-shm'):
+        try:
+            os.remove(name)
+        except FileNotFoundError:
+            pass
+
+def drop_analytics_partition(month):
+    """Drop an archived month; returns the number of rows it held.
+
+    Its rows leave the counters, rollups and media references through one grouped pass
+    over the partition file; the rows themselves go with the file.
+    """
+    partition = db.session.get(AnalyticsPartition, month)
+    if partition is None:
+        return 0
+    path, row_count = partition.path, partition.row_count
+    with partition_engine(path).connect() as conn:
+        counters, rollups, media_refs = counter_totals(conn), rollup_totals(conn), media_ref_totals(conn)
+    apply_counter_deltas({day: (-t, -p, -n) for day, (t, p, n) in counters.items()})
+    apply_rollup_deltas({key: -count for key, count in rollups.items()})
+    apply_media_ref_deltas({key: -count for key, count in media_refs.items()})
+    db.session.delete(partition)
+    db.session.commit()
+    remove_partition_file(path)
+    return row_count
+
+def drop_expired_partitions(now=None):
+    """Drop archived months that every retention rule has expired; returns the rows dropped.
+
+    A month is only dropped whole, so with per-camera overrides shorter than
+    RETENTION_DAYS archived rows outlive their camera's period until the month expires.
+    """
+    if not app.config['RETENTION_DAYS']:
+        return 0
+    cutoff = min(cutoff for _, cutoff in retention_rules(now or datetime.now()))
+    months = db.session.scalars(
+        select(AnalyticsPartition.month).where(AnalyticsPartition.month < cutoff.strftime("%Y-%m"))
+    ).all()
+    return sum(drop_analytics_partition(month) for month in months)
+
+def clear_analytics_partitions():
+    """Forget every partition and delete its file; the caller resets the derived state."""
+    paths = db.session.scalars(select(AnalyticsPartition.path)).all()
+    db.session.execute(delete(AnalyticsPartition))
+    db.session.commit()
+    for path in paths:
+        remove_partition_file(path)
+
+########################################### chunked uploads ####################################################
+# init -> put chunks at the acknowledged offset -> complete. Each chunk is copied from
+# the socket to the partial file UPLOAD_BUFFER_SIZE bytes at a time, and the partial
+# file's size on disk is the acknowledged offset, so a dropped client resumes from
+# /upload-status instead of starting over. Writers to one upload are serialized by a
+# lock on its partial file; uploads idle for UPLOAD_STALE_AFTER are swept by the
+# retention thread.
+
+_upload_locks = {}  # upload id -> threading.Lock, only used without fcntl
+_upload_locks_guard = threading.Lock()
+
+def upload_state_paths(upload_id):
+    """(partial file, metadata file) for an upload id, or None if the id is malformed."""
+    if not re.fullmatch(r'[0-9a-f]{32}', upload_id or ''):
+        return None
+    base = os.path.join(app.config['UPLOAD_FOLDER'], 'incoming', upload_id)
+    return base + '.part', base + '.json'
+
+@contextmanager
+def upload_locked(upload_id, blocking=True):
+    """Hold the exclusive lock of an upload; yields whether it was acquired (always True
+    when blocking). Raises FileNotFoundError once the partial file is gone.
+
+    flock() on the partial file serializes every worker process; without fcntl (Windows)
+    a lock per upload id only serializes the threads of this process.
+    """
+    if fcntl is not None:
+        with open(upload_state_paths(upload_id)[0], 'rb') as f:  # closing it releases the lock
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            yield True
+        return
+    with _upload_locks_guard:
+        lock = _upload_locks.setdefault(upload_id, threading.Lock())
+    acquired = lock.acquire(blocking)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            lock.release()
+
+def load_upload(upload_id):
+    paths = upload_state_paths(upload_id)
+    if paths is None:
+        return None
+    try:
+        with open(paths[1]) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_upload(meta):
+    meta_path = upload_state_paths(meta['upload_id'])[1]
+    tmp_path = meta_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+def completed_upload_key(upload_id):
+    """Media store key of a completed chunked upload, or None."""
+    meta = load_upload(upload_id)
+    return meta['content_key'] if meta and meta['completed'] else None
+
+def sweep_stale_uploads(now=None):
+    """Delete chunked uploads not written to for UPLOAD_STALE_AFTER seconds; returns how many.
+
+    That covers uploads a client abandoned part way and the metadata of completed ones.
+    An upload whose lock is held is being written to and is left alone.
+    """
+    folder = os.path.join(app.config['UPLOAD_FOLDER'], 'incoming')
+    cutoff = (now or time.time()) - app.config['UPLOAD_STALE_AFTER']
+    try:
+        names = os.listdir(folder)
+    except FileNotFoundError:
+        return 0
+    swept = 0
+    for name in names:
+        upload_id, _, suffix = name.partition('.')
+        paths = upload_state_paths(upload_id)
+        path = os.path.join(folder, name)
+        try:
+            if paths is None or os.path.getmtime(path) > cutoff:
+                continue
+            if suffix == 'part':
+                with upload_locked(upload_id, blocking=False) as locked:
+                    if not locked or os.path.getmtime(path) > cutoff:
+                        continue
+                    if os.path.exists(paths[1]):
+                        os.remove(paths[1])  # metadata first: a late PUT then answers 404
+                    os.remove(path)
+                with _upload_locks_guard:
+                    _upload_locks.pop(upload_id, None)
+                swept += 1
+            elif suffix in ('json', 'json.tmp') and not os.path.exists(paths[0]):
+                os.remove(path)  # a completed upload, or one whose partial file is already gone
+                if suffix == 'json':
+                    swept += 1
+        except FileNotFoundError:
+            continue
+    return swept
+
+@app.route('/upload-init', methods=['POST'])
+def upload_init():
+    """Start a chunked upload and return its id."""
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'status': 'error', 'message': 'JSON object required'}), 400
+        filename = data.get('filename', '')
+        filename = secure_filename(filename) if isinstance(filename, str) else ''
+        try:
+            total_size = int(data.get('total_size', -1))
+        except (TypeError, ValueError):
+            return jsonify({'status': 'error', 'message': 'Invalid total_size'}), 400
+
+        if not filename or not allowed_file(filename):
+            return jsonify({'status': 'error', 'message': 'File type not allowed'}), 400
+        if total_size < 0 or total_size > app.config['MAX_CHUNKED_UPLOAD_SIZE']:
+            return jsonify({'status': 'error', 'message': 'Invalid total_size'}), 400
+
+        upload_id = uuid.uuid4().hex
+        part_path, _ = upload_state_paths(upload_id)
+        os.makedirs(os.path.dirname(part_path), exist_ok=True)
+        open(part_path, 'wb').close()
+        save_upload({
+            'upload_id': upload_id,
+            'filename': filename,
+            'total_size': total_size,
+            'completed': False,
+            'content_key': None,
+        })
+
+        return jsonify({
+            'status': 'success',
+            'upload_id': upload_id,
+            'offset': 0,
+            'chunk_size': app.config['UPLOAD_CHUNK_SIZE']
+        }), 201
+
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/upload-chunk/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    """Append the raw request body at the offset given in the Upload-Offset header."""
+    try:
+        meta = load_upload(upload_id)
+        if meta is None:
+            return jsonify({'status': 'error', 'message': 'Upload not found'}), 404
+        if meta['completed']:
+            return jsonify({'status': 'error', 'message': 'Upload already completed'}), 409
+
+        part_path, _ = upload_state_paths(upload_id)
+        try:
+            offset = int(request.headers.get('Upload-Offset', request.args.get('offset', -1)))
+        except (TypeError, ValueError):
+            return jsonify({'status': 'error', 'message': 'Invalid Upload-Offset'}), 400
+        length = request.content_length
+        if length is None:
+            return jsonify({'status': 'error', 'message': 'Content-Length required'}), 411
+        if length > app.config['UPLOAD_CHUNK_SIZE']:
+            return jsonify({'status': 'error', 'message': 'Chunk too large'}), 413
+
+        buffer_size = app.config['UPLOAD_BUFFER_SIZE']
+        try:
+            with upload_locked(upload_id), open(part_path, 'r+b') as f:
+                # checked again under the lock: a concurrent PUT at the same offset may have
+                # just written, or the upload been completed or swept
+                meta = load_upload(upload_id)
+                if meta is None or meta['completed']:
+                    return jsonify({'status': 'error', 'message': 'Upload not found'}), 404
+                current = os.fstat(f.fileno()).st_size
+                if offset != current:
+                    return jsonify({'status': 'error', 'message': 'Offset mismatch', 'offset': current}), 409
+                if current + length > meta['total_size']:
+                    return jsonify({'status': 'error', 'message': 'Chunk exceeds total_size'}), 400
+
+                f.seek(current)
+                remaining = length
+                while remaining:
+                    buf = request.stream.read(min(buffer_size, remaining))
+                    if not buf:
+                        break
+                    f.write(buf)
+                    remaining -= len(buf)
+                f.flush()
+                os.fsync(f.fileno())
+                offset = os.fstat(f.fileno()).st_size
+        except FileNotFoundError:  # completed or swept since load_upload()
+            return jsonify({'status': 'error', 'message': 'Upload not found'}), 404
+
+        return jsonify({'status': 'success', 'offset': offset})
+
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/upload-status/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    """Report the acknowledged offset so a client can resume."""
+    meta = load_upload(upload_id)
+    if meta is None:
+        return jsonify({'status': 'error', 'message': 'Upload not found'}), 404
+    part_path, _ = upload_state_paths(upload_id)
+    try:
+        offset = meta['total_size'] if meta['completed'] else os.path.getsize(part_path)
+    except FileNotFoundError:  # swept as stale since load_upload()
+        return jsonify({'status': 'error', 'message': 'Upload not found'}), 404
+    return jsonify({
+        'status': 'success',
+        'offset': offset,
+        'total_size': meta['total_size'],
+        'completed': meta['completed']
+    })
+
+@app.route('/upload-complete/<upload_id>', methods=['POST'])
+def upload_complete(upload_id):
+    """Hash a fully received upload and move it into the media store."""
+    try:
+        meta = load_upload(upload_id)
+        if meta is None:
+            return jsonify({'status': 'error', 'message': 'Upload not found'}), 404
+        if not meta['completed']:
+            part_path, _ = upload_state_paths(upload_id)
+            try:
+                with upload_locked(upload_id):
+                    meta = load_upload(upload_id)
+                    if meta is not None and not meta['completed']:
+                        received = os.path.getsize(part_path)
+                        if received != meta['total_size']:
+                            return jsonify({'status': 'error', 'message': 'Upload incomplete',
+                                            'offset': received}), 409
+                        content_key = store_media_file(part_path, meta['filename'])
+                        meta.update(completed=True, content_key=content_key)
+                        save_upload(meta)
+            except FileNotFoundError:  # a concurrent complete moved it, or it was swept
+                meta = load_upload(upload_id)
+            if meta is None or not meta['completed']:
+                return jsonify({'status': 'error', 'message': 'Upload not found'}), 404
+
+        return jsonify({
+            'status': 'success',
+            'upload_id': upload_id,
+            'content_key': meta['content_key'],
+            'file_path': media_path(meta['content_key']).replace('\\', '/')
+        })
+
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
 @app.route('/fileupload', methods=['POST'])
 def handle_file_upload():
     """Handle file upload."""
@@ -465,15 +2559,15 @@ def handle_file_upload():
         if not allowed_file(file.filename):
             return jsonify({'status': 'error', 'message': 'File type not allowed'}), 400
 
-        # Secure the filename and save the file
+        # Secure the filename and store the file by content
         filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+        content_key = store_media_stream(file.stream, filename)
 
         return jsonify({
             'status': 'success',
             'message': f'File uploaded successfully: {filename}',
-            'file_path': file_path.replace('\\', '/')
+            'content_key': content_key,
+            'file_path': media_path(content_key).replace('\\', '/')
         })
 
     except Exception as e:
@@ -483,22 +2577,75 @@ def handle_file_upload():
 
 ########################################### Settings page ####################################################
 
+# Serve the settings list endpoints from list_cache. Only safe with a single worker process:
+# the cache is per process, so a write in one worker would leave the others serving old lists.
+app.config['LIST_CACHE_ENABLED'] = False
+
+class ListResponseCache:
+    """Serialized JSON bodies of the settings list endpoints, keyed by table and endpoint.
+
+    Every route that writes a table calls invalidate() after its commit. A body built
+    while an invalidation happened is returned but not stored, so a slow read can never
+    put stale data back. The cache is per process and has no cross-process invalidation,
+    so it is off unless LIST_CACHE_ENABLED is set for a single-process deployment.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bodies = {}  # (table, endpoint) -> bytes
+        self._generations = {}  # table -> count of invalidations
+
+    def response(self, table, endpoint, build):
+        """Return the cached body for (table, endpoint), calling build() for the rows on a miss.
+
+        endpoint is any hashable naming the response, e.g. (route name, fields).
+        """
+        key = (table, endpoint)
+        if not app.config['LIST_CACHE_ENABLED']:
+            return Response((app.json.dumps(build()) + "\n").encode(), status=200, mimetype=app.json.mimetype)
+        body = self._bodies.get(key)
+        if body is None:
+            with self._lock:
+                generation = self._generations.get(table, 0)
+            body = (app.json.dumps(build()) + "\n").encode()
+            with self._lock:
+                if self._generations.get(table, 0) == generation:
+                    self._bodies[key] = body
+        return Response(body, status=200, mimetype=app.json.mimetype)
+
+    def invalidate(self, table):
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            for key in [key for key in self._bodies if key[0] == table]:
+                del self._bodies[key]
+
+list_cache = ListResponseCache()
+
+camera_serializer = ModelSerializer(Camera, ('camera_id', 'camera_url', 'camera_location', 'status'))
+user_serializer = ModelSerializer(  # password is never exposed
+    User, ('user_id', 'email', 'mob', 'name', 'permission', 'company', 'address', 'status'))
+subscription_serializer = ModelSerializer(
+    Subscription, ('subscription_id', 'device_id', 'user_id', 'machine_id', 'expiry_date', 'camera_count',
+                   'ai_module', 'status'))
+
+# Default response shapes when no fields= is given
+USER_SETTINGS_FIELDS = ('user_id', 'email', 'name', 'permission', 'status')
+USER_VIEWALL_FIELDS = ('user_id', 'email', 'mob', 'name', 'company', 'address', 'status')
+SUBSCRIPTION_SETTINGS_FIELDS = ('subscription_id', 'device_id', 'user_id', 'expiry_date', 'camera_count',
+                                'ai_module', 'status')
+
 
 #camera
 @app.route("/settings-camera", methods=["POST"])
 @jwt_required()
 def settings_camera():
-    cameras = Camera.query.all()
-    result = [
-        {
-            "camera_id": c.camera_id,
-            "camera_url": c.camera_url,
-            "camera_location": c.camera_location,
-            "status": c.status,
-        }
-        for c in cameras
-    ]
-    return jsonify(result), 200
+    requested = requested_fields(request.get_json(silent=True))
+    try:
+        fields = camera_serializer.parse_fields(requested, camera_serializer.fields)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return list_cache.response("camera", ("settings_camera", fields),
+                               lambda: camera_serializer.all(Camera.query, fields))
 
 @app.route("/insert-camera", methods=["POST"])
 @jwt_required()
@@ -512,6 +2659,7 @@ def insert_camera():
         )
         db.session.add(new_camera)
         db.session.commit()
+        list_cache.invalidate("camera")
         return jsonify({"msg": "Camera added successfully"}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -520,34 +2668,44 @@ def insert_camera():
 @jwt_required()
 def settings_camera_search():
     data = request.get_json()
+    try:
+        fields = camera_serializer.parse_fields(requested_fields(data), camera_serializer.fields)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     query = Camera.query.filter(Camera.camera_location.contains(data["query"]))
-    result = [
-        {
-            "camera_id": c.camera_id,
-            "camera_url": c.camera_url,
-            "camera_location": c.camera_location,
-            "status": c.status,
-        }
-        for c in query
-    ]
-    return jsonify(result), 200
+    return jsonify(camera_serializer.all(query, fields)), 200
 
 @app.route("/settings-camera-delete", methods=["POST"])
 @jwt_required()
 def settings_camera_delete():
     data = request.get_json()
-    camera = Camera.query.filter_by(camera_id=data["camera_id"]).first()
-    if camera:
-        db.session.delete(camera)
+    if Camera.query.filter_by(camera_id=data["camera_id"]).delete():
         db.session.commit()
+        list_cache.invalidate("camera")
         return jsonify({"msg": "Camera deleted"}), 200
     return jsonify({"msg": "Camera not found"}), 404
 
+@app.route("/settings-camera-delete-bulk", methods=["POST"])
+@jwt_required()
+def settings_camera_delete_bulk():
+    """Delete cameras by camera_ids and/or a filter (camera_location, status) in one statement."""
+    try:
+        conditions = bulk_delete_conditions(request.get_json() or {}, Camera.camera_id, {
+            "camera_location": Camera.camera_location, "status": Camera.status,
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    deleted = Camera.query.filter(*conditions).delete(synchronize_session=False)
+    db.session.commit()
+    list_cache.invalidate("camera")
+    return jsonify({"msg": "Cameras deleted", "deleted": deleted}), 200
+
 @app.route("/settings-camera-delete-all", methods=["POST"])
 @jwt_required()
 def settings_camera_delete_all():
     Camera.query.delete()
     db.session.commit()
+    list_cache.invalidate("camera")
     return jsonify({"msg": "All cameras deleted"}), 200
 
 @app.route("/settings-camera-edit", methods=["POST"])
@@ -560,6 +2718,7 @@ def settings_camera_edit():
         camera.camera_location = data["camera_location"]
         camera.status = data["status"]
         db.session.commit()
+        list_cache.invalidate("camera")
         return jsonify({"msg": "Camera updated"}), 200
     return jsonify({"msg": "Camera not found"}), 404
 
@@ -567,17 +2726,9 @@ def settings_camera_edit():
 @jwt_required()
 def camera_viewall():
     try:
-        cameras = Camera.query.all()
-        result = [
-            {
-                "camera_id": c.camera_id,
-                "camera_url": c.camera_url,
-                "camera_location": c.camera_location,
-                "status": c.status,
-            }
-            for c in cameras
-        ]
-        return jsonify(result), 200
+        fields = camera_serializer.parse_fields(requested_fields(None), camera_serializer.fields)
+        return list_cache.response("camera", ("camera_viewall", fields),
+                                   lambda: camera_serializer.all(Camera.query, fields))
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
@@ -592,18 +2743,13 @@ def settings_camera_close():
 @app.route("/settings-users", methods=["POST"])
 @jwt_required()
 def settings_users():
-    users = User.query.all()
-    result = [
-        {
-            "user_id": u.user_id,
-            "email": u.email,
-            "name": u.name,
-            "permission": u.permission,
-            "status": u.status,
-        }
-        for u in users
-    ]
-    return jsonify(result), 200
+    requested = requested_fields(request.get_json(silent=True))
+    try:
+        fields = user_serializer.parse_fields(requested, USER_SETTINGS_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return list_cache.response("user", ("settings_users", fields),
+                               lambda: user_serializer.all(User.query, fields))
 
 @app.route("/insert-user", methods=["POST"])
 @jwt_required()
@@ -623,6 +2769,7 @@ def insert_user():
         )
         db.session.add(new_user)
         db.session.commit()
+        list_cache.invalidate("user")
         return jsonify({"msg": "User added successfully"}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -631,20 +2778,9 @@ def insert_user():
 @jwt_required()
 def user_viewall():
     try:
-        users = User.query.all()
-        result = [
-            {
-                "user_id": u.user_id,
-                "email": u.email,
-                "mob": u.mob,
-                "name": u.name,
-                "company": u.company,
-                "address": u.address,
-                "status": u.status,
-            }
-            for u in users
-        ]
-        return jsonify(result), 200
+        fields = user_serializer.parse_fields(requested_fields(None), USER_VIEWALL_FIELDS)
+        return list_cache.response("user", ("user_viewall", fields),
+                                   lambda: user_serializer.all(User.query, fields))
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
@@ -652,35 +2788,44 @@ def user_viewall():
 @jwt_required()
 def settings_users_search():
     data = request.get_json()
+    try:
+        fields = user_serializer.parse_fields(requested_fields(data), USER_SETTINGS_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     query = User.query.filter(User.name.contains(data["query"]))
-    result = [
-        {
-            "user_id": u.user_id,
-            "email": u.email,
-            "name": u.name,
-            "permission": u.permission,
-            "status": u.status,
-        }
-        for u in query
-    ]
-    return jsonify(result), 200
+    return jsonify(user_serializer.all(query, fields)), 200
 
 @app.route("/settings-users-delete", methods=["POST"])
 @jwt_required()
 def settings_users_delete():
     data = request.get_json()
-    user = User.query.filter_by(user_id=data["user_id"]).first()
-    if user:
-        db.session.delete(user)
+    if User.query.filter_by(user_id=data["user_id"]).delete():
         db.session.commit()
+        list_cache.invalidate("user")
         return jsonify({"msg": "User deleted"}), 200
     return jsonify({"msg": "User not found"}), 404
 
+@app.route("/settings-users-delete-bulk", methods=["POST"])
+@jwt_required()
+def settings_users_delete_bulk():
+    """Delete users by user_ids and/or a filter (permission, company, status) in one statement."""
+    try:
+        conditions = bulk_delete_conditions(request.get_json() or {}, User.user_id, {
+            "permission": User.permission, "company": User.company, "status": User.status,
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    deleted = User.query.filter(*conditions).delete(synchronize_session=False)
+    db.session.commit()
+    list_cache.invalidate("user")
+    return jsonify({"msg": "Users deleted", "deleted": deleted}), 200
+
 @app.route("/settings-users-delete-all", methods=["POST"])
 @jwt_required()
 def settings_users_delete_all():
     User.query.delete()
     db.session.commit()
+    list_cache.invalidate("user")
     return jsonify({"msg": "All users deleted"}), 200
 
 @app.route("/settings-users-edit", methods=["POST"])
@@ -694,6 +2839,7 @@ def settings_users_edit():
         user.permission = data["permission"]
         user.status = data["status"]
         db.session.commit()
+        list_cache.invalidate("user")
         return jsonify({"msg": "User updated"}), 200
     return jsonify({"msg": "User not found"}), 404
 
@@ -708,20 +2854,13 @@ def settings_users_close():
 @app.route("/settings-subscription", methods=["POST"])
 @jwt_required()
 def settings_subscription():
-    subscriptions = Subscription.query.all()
-    result = [
-        {
-            "subscription_id": s.subscription_id,
-            "device_id": s.device_id,
-            "user_id": s.user_id,
-            "expiry_date": s.expiry_date,
-            "camera_count": s.camera_count,
-            "ai_module": s.ai_module,
-            "status": s.status,
-        }
-        for s in subscriptions
-    ]
-    return jsonify(result), 200
+    requested = requested_fields(request.get_json(silent=True))
+    try:
+        fields = subscription_serializer.parse_fields(requested, SUBSCRIPTION_SETTINGS_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return list_cache.response("subscription", ("settings_subscription", fields),
+                               lambda: subscription_serializer.all(Subscription.query, fields))
 
 
 @app.route("/insert-subscription", methods=["POST"])
@@ -740,6 +2879,7 @@ def insert_subscription():
         )
         db.session.add(new_subscription)
         db.session.commit()
+        list_cache.invalidate("subscription")
         return jsonify({"msg": "Subscription added successfully"}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -749,21 +2889,9 @@ def insert_subscription():
 @jwt_required()
 def subscription_viewall():
     try:
-        subscriptions = Subscription.query.all()
-        result = [
-            {
-                "subscription_id": s.subscription_id,
-                "device_id": s.device_id,
-                "user_id": s.user_id,
-                "machine_id": s.machine_id,
-                "expiry_date": s.expiry_date,
-                "camera_count": s.camera_count,
-                "ai_module": s.ai_module,
-                "status": s.status,
-            }
-            for s in subscriptions
-        ]
-        return jsonify(result), 200
+        fields = subscription_serializer.parse_fields(requested_fields(None), subscription_serializer.fields)
+        return list_cache.response("subscription", ("subscription_viewall", fields),
+                                   lambda: subscription_serializer.all(Subscription.query, fields))
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
@@ -773,37 +2901,46 @@ def subscription_viewall():
 @jwt_required()
 def settings_subscription_search():
     data = request.get_json()
+    try:
+        fields = subscription_serializer.parse_fields(requested_fields(data), SUBSCRIPTION_SETTINGS_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     query = Subscription.query.filter(Subscription.user_id.contains(data["query"]))
-    result = [
-        {
-            "subscription_id": s.subscription_id,
-            "device_id": s.device_id,
-            "user_id": s.user_id,
-            "expiry_date": s.expiry_date,
-            "camera_count": s.camera_count,
-            "ai_module": s.ai_module,
-            "status": s.status,
-        }
-        for s in query
-    ]
-    return jsonify(result), 200
+    return jsonify(subscription_serializer.all(query, fields)), 200
 
 @app.route("/settings-subscription-delete", methods=["POST"])
 @jwt_required()
 def settings_subscription_delete():
     data = request.get_json()
-    subscription = Subscription.query.filter_by(subscription_id=data["subscription_id"]).first()
-    if subscription:
-        db.session.delete(subscription)
+    if Subscription.query.filter_by(subscription_id=data["subscription_id"]).delete():
         db.session.commit()
+        list_cache.invalidate("subscription")
         return jsonify({"msg": "Subscription deleted"}), 200
     return jsonify({"msg": "Subscription not found"}), 404
 
+@app.route("/settings-subscription-delete-bulk", methods=["POST"])
+@jwt_required()
+def settings_subscription_delete_bulk():
+    """Delete subscriptions by subscription_ids and/or a filter (user_id, device_id, ai_module,
+    status) in one statement."""
+    try:
+        conditions = bulk_delete_conditions(request.get_json() or {}, Subscription.subscription_id, {
+            "user_id": Subscription.user_id, "device_id": Subscription.device_id,
+            "ai_module": Subscription.ai_module, "status": Subscription.status,
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    deleted = Subscription.query.filter(*conditions).delete(synchronize_session=False)
+    db.session.commit()
+    list_cache.invalidate("subscription")
+    return jsonify({"msg": "Subscriptions deleted", "deleted": deleted}), 200
+
 @app.route("/settings-subscription-delete-all", methods=["POST"])
 @jwt_required()
 def settings_subscription_delete_all():
     Subscription.query.delete()
     db.session.commit()
+    list_cache.invalidate("subscription")
     return jsonify({"msg": "All subscriptions deleted"}), 200
 
 @app.route("/settings-subscription-edit", methods=["POST"])
@@ -819,6 +2956,7 @@ def settings_subscription_edit():
         subscription.ai_module = data["ai_module"]
         subscription.status = data["status"]
         db.session.commit()
+        list_cache.invalidate("subscription")
         return jsonify({"msg": "Subscription updated"}), 200
     return jsonify({"msg": "Subscription not found"}), 404
 
@@ -827,7 +2965,104 @@ def settings_subscription_edit():
 def settings_subscription_close():
     return jsonify({"msg": "Subscription settings closed"}), 200
 
+def rebuild_analytics_table():
+    """Recreate analytics from the model and copy its rows back with the same ids.
+
+    SQLite cannot change constraints or AUTOINCREMENT in place, so the table is renamed,
+    recreated and copied. Its triggers go with the old table; create_fts_index() puts
+    them back and rebuilds the search index.
+    """
+    table = Analytics.__table__
+    legacy = f"{table.name}_legacy"
+    with db.engine.begin() as conn:
+        old_columns = {c["name"] for c in inspect(conn).get_columns(table.name)}
+        conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {legacy}"))
+        index_names = conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t AND sql IS NOT NULL"
+        ), {"t": legacy}).scalars().all()
+        for name in index_names:
+            conn.execute(text(f'DROP INDEX "{name}"'))
+        table.create(conn)
+        columns = ", ".join(c.name for c in table.columns if c.name in old_columns)
+        conn.execute(text(f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {legacy}"))
+        conn.execute(text(f"DROP TABLE {legacy}"))
+
+def drop_analytics_user_unique():
+    """One-shot migration: rebuild analytics without the legacy UNIQUE(user_id).
+
+    A user has many analytics events; the constraint made every second event for the
+    same user fail.
+    """
+    constraints = inspect(db.engine).get_unique_constraints(Analytics.__tablename__)
+    if any(c["column_names"] == ["user_id"] for c in constraints):
+        rebuild_analytics_table()
+
+def migrate_analytics_autoincrement():
+    """One-shot migration: rebuild analytics as AUTOINCREMENT, with its id sequence
+    starting above every id in the table and in the partition files.
+
+    Without it SQLite reuses the ids of deleted top rows, so a new event could take
+    the id of an archived one.
+    """
+    sql = db.session.scalar(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :t"),
+                            {"t": Analytics.__tablename__})
+    db.session.commit()
+    if "AUTOINCREMENT" in (sql or "").upper():
+        return
+    rebuild_analytics_table()
+    high_water = 0
+    for path in db.session.scalars(select(AnalyticsPartition.path)).all():
+        with partition_engine(path).connect() as conn:
+            high_water = max(high_water, conn.scalar(select(func.max(Analytics.analytics_id))) or 0)
+    with db.engine.begin() as conn:
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = :t"), {"t": Analytics.__tablename__})
+        conn.execute(text(
+            "INSERT INTO sqlite_sequence (name, seq) "
+            "SELECT :t, max(:high_water, coalesce((SELECT max(analytics_id) FROM analytics), 0))"
+        ), {"t": Analytics.__tablename__, "high_water": high_water})
+
+def add_missing_columns():
+    """create_all() never alters existing tables; add model columns an older schema lacks."""
+    inspector = inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column.type.compile(db.engine.dialect)}'
+                if column.default is not None and column.default.is_scalar:
+                    ddl += f" NOT NULL DEFAULT {column.default.arg!r}"
+                conn.execute(text(ddl))
+
+def create_missing_indexes():
+    """create_all() only indexes new tables; add declared indexes to existing ones."""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+def init_db():
+    """Create missing tables and derived state for an existing database."""
+    db.create_all()
+    add_missing_columns()
+    migrate_event_time(db, Analytics)
+    drop_analytics_user_unique()
+    migrate_analytics_autoincrement()
+    create_missing_indexes()
+    try:
+        create_fts_index()
+    except Exception as e:
+        app.logger.warning("FTS5 search index unavailable, falling back to LIKE: %s", e)
+        app.config['SEARCH_USE_FTS'] = False
+    if DashboardCounter.query.first() is None:
+        rebuild_dashboard_counters()
+    if AnalyticsRollup.query.first() is None and Analytics.query.first() is not None:
+        rebuild_analytics_rollups()
+    fail_orphaned_report_jobs()
+
 if __name__ == "__main__":
     with app.app_context():
-        db.create_all()
+        init_db()
     app.run(debug=True)
@@ -0,0 +1,287 @@
+"""Pieces shared by app.py and analytics-table/app.py: SQLite connection settings,
+the Prometheus metrics collector and its request hooks, and event time parsing."""
+import os
+import time
+import sqlite3
+import threading
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from flask import Response, g, request
+from sqlalchemy import event, inspect, text, update
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session
+
+######################################### SQLite #########################################
+
+# SQLite storage profiles, chosen with the SQLITE_PROFILE environment variable. "wal" lets
+# readers and one writer run concurrently and makes writers wait for the lock instead of
+# failing; "off" keeps SQLite's defaults (rollback journal) for comparison. WAL mode is
+# stored in the database file, so going back needs an explicit PRAGMA journal_mode=DELETE.
+SQLITE_PROFILES = {
+    "off": {"pragmas": {}, "engine": {}},
+    "wal": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",  # fsync at checkpoints only; durable against app crashes, not power loss
+            "cache_size": -64000,  # KiB, i.e. 64 MB of page cache per connection
+            "mmap_size": 256 * 1024 * 1024,
+            "busy_timeout": 10000,  # ms a writer waits for the lock before "database is locked"
+            "temp_store": "MEMORY",
+        },
+        # One pooled connection per worker thread; overflow covers the write-behind and report threads.
+        # Only used with a QueuePool, see configure_sqlite()
+        "engine": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 30},
+    },
+}
+
+def uses_queue_pool(database_uri):
+    """False for in-memory SQLite, which SQLAlchemy serves from a StaticPool that takes no pool sizes."""
+    url = make_url(database_uri)
+    if url.get_backend_name() != "sqlite":
+        return True
+    return url.database not in (None, "", ":memory:") and url.query.get("mode") != "memory"
+
+def configure_sqlite(app):
+    """Put the SQLITE_PROFILE's pragmas and engine options into app.config; call before SQLAlchemy(app),
+    after SQLALCHEMY_DATABASE_URI is set."""
+    profile = SQLITE_PROFILES[os.environ.get("SQLITE_PROFILE", "wal")]
+    app.config["SQLITE_PRAGMAS"] = profile["pragmas"]
+    if uses_queue_pool(app.config["SQLALCHEMY_DATABASE_URI"]):
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = profile["engine"]
+
+    @event.listens_for(Engine, "connect")
+    def apply_sqlite_pragmas(dbapi_connection, connection_record):
+        """Apply SQLITE_PRAGMAS to every new SQLite connection, including the report workers' engines."""
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        for name, value in app.config["SQLITE_PRAGMAS"].items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def dispose_engines_after_fork(app, db, other_engines=lambda: ()):
+    """Pooled connections must not cross a fork (e.g. gunicorn --preload); children open their own.
+
+    other_engines returns any engines the app made outside Flask-SQLAlchemy.
+    """
+    def dispose():
+        with app.app_context():
+            for engine in list(db.engines.values()) + list(other_engines()):
+                engine.dispose(close=False)
+
+    os.register_at_fork(after_in_child=dispose)
+
+######################################### metrics #########################################
+
+class Metrics:
+    """Counters, gauges and histograms for this process, rendered in Prometheus text format.
+
+    Updates go to one of STRIPES shards chosen by thread id, each with its own lock, so
+    concurrent requests almost never wait on each other; a scrape adds the shards up.
+    Each worker process keeps its own numbers, as Prometheus expects of separate targets.
+    """
+    STRIPES = 16
+
+    def __init__(self):
+        self._stripes = [(threading.Lock(), {}) for _ in range(self.STRIPES)]
+        self._meta = {}  # name -> (type, help, buckets)
+
+    def register(self, name, kind, help_text, buckets=None):
+        self._meta[name] = (kind, help_text, tuple(buckets) if buckets else None)
+
+    def _stripe(self):
+        return self._stripes[threading.get_ident() % self.STRIPES]
+
+    def inc(self, name, labels=(), value=1):
+        """Add value to a counter, or to a gauge (negative to decrease it)."""
+        lock, values = self._stripe()
+        key = (name, labels)
+        with lock:
+            values[key] = values.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = self._meta[name][2]
+        lock, values = self._stripe()
+        key = (name, labels)
+        with lock:
+            state = values.get(key)
+            if state is None:
+                state = values[key] = [[0] * (len(buckets) + 1), 0.0]
+            state[0][bisect_left(buckets, value)] += 1
+            state[1] += value
+
+    def _totals(self):
+        totals = {}
+        for lock, values in self._stripes:
+            with lock:
+                items = [(key, [list(v[0]), v[1]] if isinstance(v, list) else v) for key, v in values.items()]
+            for key, value in items:
+                if key not in totals:
+                    totals[key] = value
+                elif isinstance(value, list):
+                    totals[key] = [[a + b for a, b in zip(totals[key][0], value[0])], totals[key][1] + value[1]]
+                else:
+                    totals[key] += value
+        return totals
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = tuple(labels) + tuple(extra)
+        if not pairs:
+            return ""
+        escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+    def render(self):
+        totals = self._totals()
+        lines = []
+        for name, (kind, help_text, buckets) in self._meta.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (key_name, labels), value in sorted(totals.items(), key=lambda item: item[0]):
+                if key_name != name:
+                    continue
+                if kind != "histogram":
+                    lines.append(f"{name}{self._labels(labels)} {value}")
+                    continue
+                counts, total = value
+                cumulative = 0
+                for bound, count in zip(buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{self._labels(labels, [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{self._labels(labels)} {total}")
+                lines.append(f"{name}_count{self._labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+def init_metrics(app, upload_endpoints=()):
+    """Create the request and commit metrics for app, install their hooks and the /metrics route.
+
+    upload_endpoints names the view functions that receive uploads; every body they get
+    counts toward http_upload_bytes_total, whatever its Content-Type.
+    """
+    upload_endpoints = frozenset(upload_endpoints)
+    metrics = Metrics()
+    metrics.register("http_requests_total", "counter", "Requests handled, by route, method and status.")
+    metrics.register("http_request_duration_seconds", "histogram",
+                     "Time spent handling requests, by route and method.", LATENCY_BUCKETS)
+    metrics.register("http_requests_in_flight", "gauge", "Requests currently being handled, by route.")
+    metrics.register("http_upload_bytes_total", "counter", "Request body bytes received by upload requests, by route.")
+    metrics.register("db_commit_duration_seconds", "histogram", "Time spent in session commits.", LATENCY_BUCKETS)
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_route = request.url_rule.rule if request.url_rule else "unmatched"
+        g.metrics_started = time.perf_counter()
+        metrics.inc("http_requests_in_flight", (("route", g.metrics_route),))
+
+    @app.after_request
+    def record_response_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        started = g.pop("metrics_started", None)
+        if started is None:  # already recorded; streamed responses tear down a second time
+            return
+        route = (("route", g.metrics_route),)
+        method = (("method", request.method),)
+        metrics.inc("http_requests_in_flight", route, -1)
+        metrics.inc("http_requests_total", route + method + (("status", str(g.get("metrics_status", 500))),))
+        metrics.observe("http_request_duration_seconds", route + method, time.perf_counter() - started)
+        if request.endpoint in upload_endpoints and request.content_length:
+            metrics.inc("http_upload_bytes_total", route, request.content_length)
+
+    @event.listens_for(Session, "before_commit")
+    def start_commit_timer(session):
+        session.info["commit_started"] = time.perf_counter()
+
+    @event.listens_for(Session, "after_commit")
+    def record_commit_time(session):
+        started = session.info.pop("commit_started", None)
+        if started is not None:
+            metrics.observe("db_commit_duration_seconds", (), time.perf_counter() - started)
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics_endpoint():
+        """Prometheus scrape endpoint."""
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    return metrics
+
+######################################### event times #########################################
+
+EVENT_TIME_FORMATS = (
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d",
+    "%d-%m-%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M:%S",
+    "%d-%m-%Y",
+    "%d/%m/%Y",
+)
+
+def parse_event_time(value):
+    """Parse a stored or client-supplied date string into a datetime, or None."""
+    if value is None or isinstance(value, datetime):
+        return value
+    value = str(value).strip()
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in EVENT_TIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+def date_range_bounds(start_date, end_date):
+    """Turn request start/end strings into a half-open [start, end) range.
+
+    A date-only end_date covers that whole day.
+    """
+    start = parse_event_time(start_date)
+    end = parse_event_time(end_date)
+    if start is None or end is None:
+        raise ValueError("Invalid start_date or end_date")
+    if len(str(end_date).strip()) == 10:
+        end += timedelta(days=1)
+    return start, end
+
+def migrate_event_time(db, model, batch_size=5000):
+    """One-shot migration: add model's indexed event_time column and backfill it from create_date.
+
+    Safe to re-run; only rows with a NULL event_time are touched, in primary key batches.
+    """
+    table = model.__table__
+    columns = {c["name"] for c in inspect(db.engine).get_columns(table.name)}
+    if "event_time" not in columns:
+        with db.engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN event_time DATETIME"))
+    for index in table.indexes:
+        index.create(db.engine, checkfirst=True)
+
+    last_id = 0
+    while True:
+        rows = db.session.query(model.analytics_id, model.create_date).filter(
+            model.event_time.is_(None),
+            model.analytics_id > last_id,
+        ).order_by(model.analytics_id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].analytics_id
+        updates = [
+            {"analytics_id": analytics_id, "event_time": parse_event_time(create_date)}
+            for analytics_id, create_date in rows
+        ]
+        updates = [u for u in updates if u["event_time"] is not None]
+        if updates:
+            db.session.execute(update(model), updates)
+        db.session.commit()
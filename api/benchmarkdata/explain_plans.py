@@ -0,0 +1,276 @@
+"""Query-plan check for every API route.
+
+Runs each route once against a scratch SQLite database, captures the SQL it
+issues and runs EXPLAIN QUERY PLAN on each statement. Exits non-zero when a
+statement walks a whole table or index ("SCAN <table>", with or without
+"USING [COVERING] INDEX") and that is not listed in KNOWN_SCANS. The routes of
+the standalone analytics-table app are checked the same way.
+
+Usage:
+    python explain_plans.py
+"""
+import io
+import os
+import hashlib
+import sys
+import shutil
+import tempfile
+import importlib.util
+from datetime import datetime
+from types import SimpleNamespace
+
+WORK_DIR = tempfile.mkdtemp(prefix="explain_plans_")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(WORK_DIR, "explain.db")
+
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+from flask_jwt_extended import create_access_token  # noqa: E402
+
+from app import (app, db, init_db, purge_expired_analytics, reclaim_unreferenced_media,  # noqa: E402
+                 archive_analytics_months, drop_expired_partitions, encode_cursor)
+
+ANALYTICS_TABLE_APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "analytics-table", "app.py")
+
+# (label, table) pairs that are allowed to scan, with the reason. The label is the route
+# path unless the call in route_calls() names one; None allows the scan everywhere.
+KNOWN_SCANS = {
+    (None, "analytics_partition"): "catalog of archived months, one row per month",
+    ("/dashboard", "camera"): "camera count over the small settings table",
+    ("/settings-camera", "camera"): "list-all endpoint",
+    ("/camera-viewall", "camera"): "list-all endpoint",
+    ("/settings-camera-search", "camera"): "substring search (contains) cannot use a B-tree index",
+    ("/settings-users", "user"): "list-all endpoint",
+    ("/user-viewall", "user"): "list-all endpoint",
+    ("/settings-users-search", "user"): "substring search (contains) cannot use a B-tree index",
+    ("/settings-subscription", "subscription"): "list-all endpoint",
+    ("/subscription-viewall", "subscription"): "list-all endpoint",
+    ("/settings-subscription-search", "subscription"): "substring search (contains) cannot use a B-tree index",
+    ("partition drop", "analytics"): "one grouped pass over the dropped month's own partition file",
+    ("analytics-table /analytics-viewall", "analytics"): "first rows of an unfiltered LIMIT",
+}
+
+USER = {
+    "user_id": "plan_user", "email": "plan@example.com", "mob": "0", "password": "secret",
+    "name": "Plan User", "permission": "admin", "company": "ITech", "address": "-", "status": "active",
+}
+CAMERA = {"camera_id": 1, "camera_url": "rtsp://cam/1", "camera_location": "Gate", "status": "active"}
+# Cursor tokens for a deep page in the timestamped rows and one in the legacy untimed rows
+CURSOR = encode_cursor(SimpleNamespace(event_time=datetime(2030, 1, 1), analytics_id=10 ** 9))
+UNTIMED_CURSOR = encode_cursor(SimpleNamespace(event_time=None, analytics_id=10 ** 9))
+SUBSCRIPTION = {
+    "subscription_id": 1, "device_id": 1, "user_id": "plan_user", "machine_id": "m-1",
+    "expiry_date": "2030-01-01", "camera_count": "4", "ai_module": "ppe", "status": "active",
+}
+
+
+def route_calls():
+    """(method, path, request kwargs[, label]) for every route, in an order that leaves data to query."""
+    def upload():
+        return {
+            "data": {
+                "user_id": "plan_user",
+                "image": (io.BytesIO(b"image"), "frame.jpg"),
+                "video": (io.BytesIO(b"video"), "clip.mp4"),
+            },
+            "content_type": "multipart/form-data",
+        }
+
+    return [
+        ("POST", "/register", {"json": USER}),
+        ("POST", "/login", {"json": {"user_id": USER["user_id"], "password": USER["password"]}}),
+        ("POST", "/analytics-action", upload()),
+        ("POST", "/analytics-action", upload()),
+        ("POST", "/dashboard", {"json": {"start_date": "2000-01-01", "end_date": "2100-01-01"}}),
+        ("POST", "/analytics-timeseries", {"json": {"start_date": "2020-01-01", "end_date": "2030-01-01",
+                                                    "interval": "day", "group_by": ["camera_id"]}}),
+        ("POST", "/analytics-timeseries", {"json": {"start_date": "2024-01-01", "end_date": "2024-01-02",
+                                                    "interval": "minute", "camera_id": "Camera1"}}),
+        ("POST", "/analytics-search", {"json": {"message": "Boots", "camera_id": "Camera1"}}),
+        ("POST", "/analytics-search", {"json": {"user_id": "plan_user"}}),
+        ("POST", "/analytics-viewall", {"json": {"row_count": 1}}),
+        ("POST", "/analytics-viewall", {"json": {"analytics_id": 1}}),
+        # deep pages must seek past the cursor, not walk the index from the top
+        ("POST", "/analytics-viewall", {"json": {"row_count": 1, "cursor": CURSOR}}, "/analytics-viewall (cursor)"),
+        ("POST", "/analytics-viewall", {"json": {"row_count": 1, "cursor": UNTIMED_CURSOR}},
+         "/analytics-viewall (cursor)"),
+        ("POST", "/analytics-search", {"json": {"user_id": "plan_user", "cursor": CURSOR}},
+         "/analytics-search (cursor)"),
+        ("POST", "/analytics-report", {"json": {"start_date": "2000-01-01", "end_date": "2100-01-01"}}),
+        ("POST", "/analytics-report", {"json": {"start_date": "2000-01-01", "end_date": "2100-01-01"}}),
+        ("GET", "/media-thumbnail/%s.jpg" % hashlib.sha256(b"image").hexdigest(), {}),
+        ("POST", "/analytics-delete", {"json": {"analytics_id": 1}}),
+        ("POST", "/analytics-delete-bulk", {"json": {"analytics_ids": [1, 2]}}),
+        ("POST", "/analytics-delete-bulk", {"json": {"filter": {"camera_id": "Camera1", "start_date": "2000-01-01",
+                                                                "end_date": "2100-01-01"}}}),
+        ("POST", "/insert-camera", {"json": CAMERA}),
+        ("POST", "/settings-camera", {}),
+        ("GET", "/camera-viewall", {}),
+        ("POST", "/settings-camera-search", {"json": {"query": "Gate"}}),
+        ("POST", "/settings-camera-edit", {"json": CAMERA}),
+        ("POST", "/settings-camera-delete", {"json": {"camera_id": 1}}),
+        ("POST", "/settings-camera-delete-bulk", {"json": {"camera_ids": [1, 2]}}),
+        ("POST", "/insert-user", {"json": dict(USER, user_id="plan_user_2")}),
+        ("POST", "/settings-users", {}),
+        ("GET", "/user-viewall", {}),
+        ("POST", "/settings-users-search", {"json": {"query": "Plan"}}),
+        ("POST", "/settings-users-edit", {"json": dict(USER, user_id="plan_user_2")}),
+        ("POST", "/settings-users-delete", {"json": {"user_id": "plan_user_2"}}),
+        ("POST", "/settings-users-delete-bulk", {"json": {"user_ids": ["plan_user_2", "plan_user_3"]}}),
+        ("POST", "/insert-subscription", {"json": SUBSCRIPTION}),
+        ("POST", "/settings-subscription", {}),
+        ("GET", "/subscription-viewall", {}),
+        ("POST", "/settings-subscription-search", {"json": {"query": "plan"}}),
+        ("POST", "/settings-subscription-edit", {"json": SUBSCRIPTION}),
+        ("POST", "/settings-subscription-delete", {"json": {"subscription_id": 1}}),
+        ("POST", "/settings-subscription-delete-bulk", {"json": {"subscription_ids": [1, 2]}}),
+        # the *-delete-all routes are whole-table by design and are not checked
+        # rows left for the background jobs below
+        ("POST", "/analytics-batch", {"json": {"events": [
+            {"user_id": "plan_user", "camera_id": "Camera2", "message": "Boots", "create_date": "2024-01-0%d" % day}
+            for day in (1, 2, 3)
+        ]}}),
+    ]
+
+
+def analytics_table_calls():
+    """(method, path, request kwargs) for the analytics-table app's routes."""
+    def upload():
+        return {
+            "data": {
+                "user_id": "plan_user",
+                "image": (io.BytesIO(b"image"), "frame.jpg"),
+                "video": (io.BytesIO(b"video"), "clip.mp4"),
+            },
+            "content_type": "multipart/form-data",
+        }
+
+    return [
+        ("POST", "/analytics-action", upload()),
+        ("POST", "/analytics-action", upload()),
+        ("POST", "/analytics-search", {"json": {"message": "Boots", "user_id": "plan_user"}}),
+        ("POST", "/analytics-viewall", {"json": {"row_count": 1}}),
+        ("POST", "/analytics-viewall", {"json": {"analytics_id": 1}}),
+        ("POST", "/analytics-report", {"json": {"start_date": "2000-01-01", "end_date": "2100-01-01"}}),
+        ("POST", "/analytics-delete", {"json": {"analytics_id": 1}}),
+        # /analytics-insertinto reads fixed local folders, /analytics-delete-all is whole-table
+    ]
+
+
+def load_analytics_table_app():
+    """Import analytics-table/app.py on its own scratch database and create its tables."""
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(WORK_DIR, "analytics-table.db")
+    spec = importlib.util.spec_from_file_location("analytics_table_app", ANALYTICS_TABLE_APP)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.app.config["UPLOAD_FOLDER"] = os.path.join(WORK_DIR, "analytics-table-uploads")
+    with module.app.app_context():
+        module.db.create_all()
+        module.migrate_event_time(module.db, module.Analytics)
+    return module
+
+
+def full_scans(plan):
+    """Tables a plan walks end to end in an EXPLAIN QUERY PLAN result.
+
+    That is every SCAN row, including "SCAN t USING [COVERING] INDEX i" (a full index walk),
+    but not virtual tables, whose SCAN is an FTS lookup.
+    """
+    tables = []
+    for row in plan:
+        detail = row[-1]
+        if detail.startswith("SCAN ") and "VIRTUAL TABLE" not in detail:
+            tables.append(detail.split()[1])
+    return tables
+
+
+def main():
+    app.config["UPLOAD_FOLDER"] = os.path.join(WORK_DIR, "uploads")
+    app.config["REPORT_WORKERS"] = 0  # render reports inline so their query is captured too
+    app.config["THUMBNAIL_WORKERS"] = 0  # no preview processes for the test uploads
+    app.config["RETENTION_INTERVAL"] = 0  # the purger is checked below, not from a background thread
+    app.config["RETENTION_DAYS"] = 30
+    app.config["RETENTION_CAMERA_DAYS"] = {"Camera1": 7}
+    app.config["ANALYTICS_HOT_MONTHS"] = 1
+    app.config["ANALYTICS_PARTITION_FOLDER"] = os.path.join(WORK_DIR, "partitions")
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            captured.append((statement, parameters))
+
+    with app.app_context():
+        init_db()
+        event.listen(Engine, "before_cursor_execute", capture)  # every engine, incl. the report renderer's
+        headers = {"Authorization": "Bearer " + create_access_token(identity=USER["user_id"])}
+
+    def check(label, statements, target=app, target_db=db):
+        failures = 0
+        with target.app_context(), target_db.engine.connect() as conn:
+            for statement, parameters in statements:
+                if "sqlite_master" in statement:
+                    continue
+                plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+                for table in full_scans(plan):
+                    reason = KNOWN_SCANS.get((label, table)) or KNOWN_SCANS.get((None, table))
+                    if reason:
+                        print(f"ok    {label}: scan of {table} ({reason})")
+                    else:
+                        failures += 1
+                        print(f"FAIL  {label}: full scan of {table}")
+                        print("      " + " ".join(statement.split()))
+        return failures
+
+    client = app.test_client()
+    failures = 0
+    for method, path, kwargs, *label in route_calls():
+        label = label[0] if label else path
+        captured.clear()
+        response = client.open(path, method=method, headers=headers, **kwargs)
+        statements = list(captured)
+        failures += check(label, statements)
+        print(f"      {method} {path} -> {response.status_code}, {len(statements)} statement(s)")
+
+    # Background jobs that are not behind a route
+    # dated far ahead so that there are rows to archive and archived months to drop
+    future = datetime(2100, 1, 1)
+    jobs = (
+        ("analytics archive", lambda: archive_analytics_months(now=future)),
+        ("partition drop", lambda: drop_expired_partitions(now=future)),
+        ("retention purge", purge_expired_analytics),
+        ("media reclaim", reclaim_unreferenced_media),
+    )
+    for label, job in jobs:
+        captured.clear()
+        with app.app_context():
+            job()
+        statements = list(captured)
+        failures += check(label, statements)
+        print(f"      {label}, {len(statements)} statement(s)")
+
+    # The standalone analytics-table app; its report writes under a fixed relative folder,
+    # so run from the scratch directory
+    table_app = load_analytics_table_app()
+    table_client = table_app.app.test_client()
+    cwd = os.getcwd()
+    os.chdir(WORK_DIR)
+    try:
+        for method, path, kwargs in analytics_table_calls():
+            captured.clear()
+            response = table_client.open(path, method=method, **kwargs)
+            statements = list(captured)
+            failures += check("analytics-table " + path, statements, table_app.app, table_app.db)
+            print(f"      analytics-table {method} {path} -> {response.status_code}, {len(statements)} statement(s)")
+    finally:
+        os.chdir(cwd)
+
+    print(f"\n{failures} unexpected full scan(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    try:
+        exit_code = main()
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+    sys.exit(exit_code)
@@ -0,0 +1,334 @@
+"""Load generator for a running instance of the benchmarkdata API.
+
+Worker threads run a weighted mix of scenarios (login, /analytics-action
+uploads, search, viewall, dashboard, reports and the settings CRUD routes)
+for a fixed duration over keep-alive connections. Per-endpoint latency
+percentiles and requests/sec go to a JSON file. Given --baseline, the run is
+compared against an earlier result file and exits non-zero when an endpoint
+regressed by more than --max-regression percent.
+
+Only the standard library is used, so it runs from any Python 3 install.
+
+Usage:
+    python app.py                        # in another shell
+    python load_test.py --concurrency 8 --duration 30 --output results.json
+    python load_test.py --baseline results.json --max-regression 20
+"""
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+import http.client
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+# scenario name -> relative weight in the mix
+DEFAULT_MIX = {
+    "login": 1,
+    "analytics_action": 4,
+    "analytics_search": 4,
+    "analytics_viewall": 4,
+    "dashboard": 2,
+    "analytics_report": 1,
+    "camera_crud": 1,
+    "user_crud": 1,
+    "subscription_crud": 1,
+    "settings_lists": 2,
+}
+
+USER_ID = "loadtest_user"
+PASSWORD = "loadtest_password"
+
+
+class Client:
+    """One keep-alive connection; records every request into the shared Stats."""
+
+    def __init__(self, base_url, stats, timeout):
+        parts = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.connect = lambda: connection_class(parts.hostname, parts.port, timeout=timeout)
+        self.prefix = parts.path.rstrip("/")
+        self.conn = self.connect()
+        self.stats = stats
+        self.token = None
+
+    def request(self, name, method, path, json_body=None, body=None, headers=None, ok=(200, 201, 202)):
+        """Send one request and return (status, parsed JSON or None); name groups it in the report."""
+        headers = dict(headers or {})
+        if self.token:
+            headers["Authorization"] = "Bearer " + self.token
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers["Content-Type"] = "application/json"
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, self.prefix + path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException) as e:
+            self.conn.close()
+            self.conn = self.connect()
+            self.stats.record(name, time.perf_counter() - started, type(e).__name__, False)
+            return None, None
+        self.stats.record(name, time.perf_counter() - started, status, status in ok)
+        try:
+            return status, json.loads(data) if data else None
+        except ValueError:
+            return status, None
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}  # endpoint -> [seconds] of successful requests
+        self.errors = {}  # endpoint -> count
+        self.statuses = {}  # endpoint -> {status: count}
+
+    def record(self, name, elapsed, status, ok):
+        with self.lock:
+            if ok:
+                self.latencies.setdefault(name, []).append(elapsed)
+            else:
+                self.errors[name] = self.errors.get(name, 0) + 1
+            counts = self.statuses.setdefault(name, {})
+            counts[str(status)] = counts.get(str(status), 0) + 1
+
+    def summary(self, elapsed):
+        result = {}
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            latencies = sorted(self.latencies.get(name, []))
+            result[name] = {
+                "requests": len(latencies) + self.errors.get(name, 0),
+                "errors": self.errors.get(name, 0),
+                "rps": round(len(latencies) / elapsed, 2),
+                "p50_ms": percentile_ms(latencies, 50),
+                "p95_ms": percentile_ms(latencies, 95),
+                "p99_ms": percentile_ms(latencies, 99),
+                "max_ms": percentile_ms(latencies, 100),
+                "statuses": self.statuses.get(name, {}),
+            }
+        return result
+
+
+def percentile_ms(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))
+    return round(sorted_values[index] * 1000, 2)
+
+
+def multipart(fields, files):
+    """Encode form fields and (field, filename, bytes) files as multipart/form-data."""
+    boundary = uuid.uuid4().hex
+    out = io.BytesIO()
+    for name, value in fields.items():
+        out.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, filename, content in files:
+        out.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                  f'Content-Type: application/octet-stream\r\n\r\n'.encode())
+        out.write(content)
+        out.write(b"\r\n")
+    out.write(f"--{boundary}--\r\n".encode())
+    return out.getvalue(), {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+
+class Scenarios:
+    """Each method is one scenario from DEFAULT_MIX; CRUD scenarios issue several requests."""
+
+    def __init__(self, client, args):
+        self.client = client
+        self.args = args
+        self.today = datetime.now().strftime("%Y-%m-%d")
+        self.tomorrow = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+
+    def login(self):
+        status, data = self.client.request("login", "POST", "/login",
+                                           {"user_id": USER_ID, "password": PASSWORD})
+        if data and data.get("token"):
+            self.client.token = data["token"]
+
+    def analytics_action(self):
+        size = self.args.upload_kb * 1024
+        body, headers = multipart({"user_id": USER_ID, "action_text": "load test"}, [
+            ("image", "frame.jpg", os.urandom(size)),
+            ("video", "clip.mp4", os.urandom(size * 4)),
+        ])
+        self.client.request("analytics_action", "POST", "/analytics-action", body=body, headers=headers)
+
+    def analytics_search(self):
+        self.client.request("analytics_search", "POST", "/analytics-search", {
+            "message": random.choice(["Coveralls", "Boots", "Hardhat", "Gloves"]),
+            "camera_id": f"Camera{random.randint(1, 6)}",
+            "row_count": 50,
+        })
+
+    def analytics_viewall(self):
+        self.client.request("analytics_viewall", "POST", "/analytics-viewall", {"row_count": 100})
+
+    def dashboard(self):
+        self.client.request("dashboard", "POST", "/dashboard",
+                            {"start_date": self.today, "end_date": self.tomorrow})
+
+    def analytics_report(self):
+        self.client.request("analytics_report", "POST", "/analytics-report", {
+            "start_date": self.today, "end_date": self.tomorrow, "format": self.args.report_format,
+        })
+
+    def settings_lists(self):
+        self.client.request("settings_camera", "POST", "/settings-camera", {})
+        self.client.request("camera_viewall", "GET", "/camera-viewall")
+        self.client.request("settings_users", "POST", "/settings-users", {})
+        self.client.request("user_viewall", "GET", "/user-viewall")
+        self.client.request("settings_subscription", "POST", "/settings-subscription", {})
+        self.client.request("subscription_viewall", "GET", "/subscription-viewall")
+
+    def camera_crud(self):
+        location = "loadtest-" + uuid.uuid4().hex
+        camera = {"camera_url": "rtsp://loadtest/stream", "camera_location": location, "status": "active"}
+        self.client.request("insert_camera", "POST", "/insert-camera", camera)
+        status, found = self.client.request("settings_camera_search", "POST", "/settings-camera-search",
+                                            {"query": location})
+        if not found:
+            return
+        camera_id = found[0]["camera_id"]
+        self.client.request("settings_camera_edit", "POST", "/settings-camera-edit",
+                            dict(camera, camera_id=camera_id, status="inactive"))
+        self.client.request("settings_camera_delete", "POST", "/settings-camera-delete", {"camera_id": camera_id})
+
+    def user_crud(self):
+        user = {
+            "user_id": "loadtest-" + uuid.uuid4().hex[:12], "email": "load@example.com", "mob": "0",
+            "password": "secret", "name": "Load Test", "permission": "user", "company": "-",
+            "address": "-", "status": "active",
+        }
+        self.client.request("insert_user", "POST", "/insert-user", user)
+        self.client.request("settings_users_search", "POST", "/settings-users-search", {"query": "Load Test"})
+        self.client.request("settings_users_edit", "POST", "/settings-users-edit", dict(user, status="inactive"))
+        self.client.request("settings_users_delete", "POST", "/settings-users-delete", {"user_id": user["user_id"]})
+
+    def subscription_crud(self):
+        owner = "loadtest-" + uuid.uuid4().hex[:12]
+        subscription = {
+            "device_id": 1, "user_id": owner, "machine_id": "loadtest", "expiry_date": "2030-01-01",
+            "camera_count": "4", "ai_module": "ppe", "status": "active",
+        }
+        self.client.request("insert_subscription", "POST", "/insert-subscription", subscription)
+        status, found = self.client.request("settings_subscription_search", "POST",
+                                            "/settings-subscription-search", {"query": owner})
+        if not found:
+            return
+        subscription_id = found[0]["subscription_id"]
+        self.client.request("settings_subscription_edit", "POST", "/settings-subscription-edit",
+                            dict(subscription, subscription_id=subscription_id, status="inactive"))
+        self.client.request("settings_subscription_delete", "POST", "/settings-subscription-delete",
+                            {"subscription_id": subscription_id})
+
+
+def worker(args, mix, stats, stop_at):
+    client = Client(args.base_url, stats, args.timeout)
+    scenarios = Scenarios(client, args)
+    scenarios.login()
+    names, weights = zip(*mix.items())
+    while time.time() < stop_at:
+        getattr(scenarios, random.choices(names, weights)[0])()
+    client.conn.close()
+
+
+def setup(args):
+    """Register the load-test user; an existing one is fine."""
+    client = Client(args.base_url, Stats(), args.timeout)
+    client.request("register", "POST", "/register", {
+        "user_id": USER_ID, "email": "loadtest@example.com", "mob": "0", "password": PASSWORD,
+        "name": "Load Test User", "permission": "admin", "company": "-", "address": "-", "status": "active",
+    })
+    status, data = client.request("login", "POST", "/login", {"user_id": USER_ID, "password": PASSWORD})
+    if not (data and data.get("token")):
+        sys.exit(f"Cannot log in as {USER_ID} at {args.base_url} (status {status})")
+
+
+def compare(results, baseline, max_regression):
+    """Endpoints whose p95 grew or rps dropped by more than max_regression percent."""
+    regressions = []
+    for name, old in baseline["endpoints"].items():
+        new = results["endpoints"].get(name)
+        if not new or not old.get("p95_ms") or not new.get("p95_ms"):
+            continue
+        if new["p95_ms"] > old["p95_ms"] * (1 + max_regression / 100):
+            regressions.append(f"{name}: p95 {old['p95_ms']} ms -> {new['p95_ms']} ms")
+        if old["rps"] and new["rps"] < old["rps"] * (1 - max_regression / 100):
+            regressions.append(f"{name}: {old['rps']} req/s -> {new['rps']} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--concurrency", type=int, default=4, help="worker threads")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+    parser.add_argument("--upload-kb", type=int, default=64, help="image size per upload; videos are 4x")
+    parser.add_argument("--report-format", choices=("pdf", "csv"), default="csv")
+    parser.add_argument("--mix", default="", help='weights to override, e.g. "analytics_action=10,login=0"')
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output", default="load_test_results.json")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    parser.add_argument("--max-regression", type=float, default=20, help="percent allowed against --baseline")
+    args = parser.parse_args()
+
+    mix = dict(DEFAULT_MIX)
+    for item in filter(None, args.mix.split(",")):
+        name, _, weight = item.partition("=")
+        if name not in mix:
+            parser.error(f"unknown scenario {name!r}; choose from {', '.join(mix)}")
+        mix[name] = float(weight)
+    mix = {name: weight for name, weight in mix.items() if weight > 0}
+
+    setup(args)
+    stats = Stats()
+    started = time.time()
+    threads = [threading.Thread(target=worker, args=(args, mix, stats, started + args.duration))
+               for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - started
+
+    endpoints = stats.summary(elapsed)
+    results = {
+        "started_at": datetime.fromtimestamp(started).isoformat(timespec="seconds"),
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "duration_s": round(elapsed, 2),
+        "mix": mix,
+        "total_requests": sum(e["requests"] for e in endpoints.values()),
+        "total_errors": sum(e["errors"] for e in endpoints.values()),
+        "total_rps": round(sum(e["rps"] for e in endpoints.values()), 2),
+        "endpoints": endpoints,
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{'endpoint':30} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, e in endpoints.items():
+        print(f"{name:30} {e['requests']:9} {e['errors']:7} {e['rps']:8.1f} "
+              f"{e['p50_ms'] or 0:8.1f} {e['p95_ms'] or 0:8.1f} {e['p99_ms'] or 0:8.1f}")
+    print(f"\n{results['total_requests']} requests, {results['total_errors']} errors, "
+          f"{results['total_rps']} req/s over {results['duration_s']} s -> {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        for line in regressions:
+            print("REGRESSION  " + line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
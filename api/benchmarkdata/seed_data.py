@@ -0,0 +1,200 @@
+"""Bulk synthetic data seeder.
+
+Generates cameras, users, subscriptions and analytics events with realistic
+shape: events follow a working-hours daily curve with quieter weekends and a
+slow growth trend, and a few busy cameras and heavy users account for most of
+the traffic (Zipf-like weights). Output is reproducible for a given --seed.
+
+Rows go in through multi-row executemany inserts in large transactions with
+relaxed pragmas. The analytics secondary indexes and the search-index
+triggers are dropped for the load, then the indexes, the FTS index, the
+dashboard counters and the time-series rollups are rebuilt in one pass each.
+
+The database is the one the app uses (DATABASE_URL, default
+sqlite:///benchmarkdata_db.db). Events carry no media files.
+
+Usage:
+    python seed_data.py --analytics 1000000 --days 90 --reset
+"""
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app import (app, db, init_db, create_fts_index, create_missing_indexes, rebuild_dashboard_counters,
+                 rebuild_analytics_rollups, clear_analytics_partitions, Analytics, Camera, User, Subscription,
+                 MediaObject, AnalyticsRollup, DashboardCounter)
+
+LOAD_PRAGMAS = {
+    "synchronous": "OFF",  # a crash mid-seed means re-running the seed, nothing else
+    "cache_size": -512000,  # KiB
+    "temp_store": "MEMORY",
+}
+
+LOCATIONS = ["Gate", "Warehouse", "Loading Bay", "Assembly Line", "Paint Shop", "Yard", "Office", "Canteen"]
+MESSAGES = {"Hardhat": 35, "Boots": 25, "Gloves": 25, "Coveralls": 15}
+ACTIONS = {"Alert sent": 50, "Acknowledged": 30, "Escalated": 10, "Ignored": 10}
+# Relative event volume per hour of day and per weekday (Monday first)
+HOURLY_WEIGHTS = [1, 1, 1, 1, 1, 2, 4, 8, 10, 10, 9, 8, 6, 8, 9, 9, 8, 6, 4, 3, 2, 2, 1, 1]
+WEEKDAY_WEIGHTS = [10, 10, 10, 10, 9, 4, 2]
+FTS_TRIGGERS = ("analytics_fts_ai", "analytics_fts_ad", "analytics_fts_au")
+
+
+def zipf_weights(count, exponent=1.1):
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+def seed_cameras(conn, rng, count):
+    rows = [{
+        "camera_url": f"rtsp://10.0.{i // 250}.{i % 250 + 1}/stream1",
+        "camera_location": f"{rng.choice(LOCATIONS)} {i // len(LOCATIONS) + 1}",
+        "status": "active" if rng.random() < 0.9 else "inactive",
+    } for i in range(count)]
+    conn.execute(insert(Camera), rows)
+    return conn.execute(text("SELECT camera_id, camera_location FROM camera")).all()
+
+
+def seed_users(conn, rng, count):
+    rows = [{
+        "user_id": f"user{i:06d}", "email": f"user{i:06d}@example.com", "mob": f"9{rng.randrange(10 ** 9):09d}",
+        "password": "password", "name": f"User {i}", "permission": "admin" if i % 20 == 0 else "user",
+        "company": f"Company {i % 25}", "address": f"{rng.randint(1, 999)} Main Road",
+        "status": "active" if rng.random() < 0.95 else "inactive",
+    } for i in range(count)]
+    conn.execute(sqlite_insert(User).on_conflict_do_nothing(index_elements=[User.user_id]), rows)
+    return [row["user_id"] for row in rows]
+
+
+def seed_subscriptions(conn, rng, user_ids, per_user):
+    today = datetime.now().date()
+    rows = []
+    for user_id in user_ids:
+        for _ in range(max(1, round(rng.expovariate(1 / per_user)))):
+            rows.append({
+                "device_id": rng.randint(1, 10000), "user_id": user_id, "machine_id": f"m-{rng.getrandbits(32):08x}",
+                "expiry_date": str(today + timedelta(days=rng.randint(-60, 730))),
+                "camera_count": str(rng.choice([2, 4, 8, 16])), "ai_module": rng.choice(["ppe", "fire", "intrusion"]),
+                "status": "active" if rng.random() < 0.85 else "expired",
+            })
+    conn.execute(insert(Subscription), rows)
+    return len(rows)
+
+
+def day_counts(total, days, end):
+    """Split total events over the days ending at end, by weekday weight and a 2x growth trend."""
+    first = end - timedelta(days=days - 1)
+    weights = [WEEKDAY_WEIGHTS[(first + timedelta(days=d)).weekday()] * (1 + d / max(days - 1, 1))
+               for d in range(days)]
+    scale = total / sum(weights)
+    counts = [int(w * scale) for w in weights]
+    counts[-1] += total - sum(counts)
+    return [(first + timedelta(days=d), count) for d, count in enumerate(counts)]
+
+
+def analytics_rows(rng, total, days, cameras, user_ids):
+    """Yield analytics row dicts in event_time order."""
+    camera_weights = zipf_weights(len(cameras))
+    user_weights = zipf_weights(len(user_ids))
+    messages, message_weights = list(MESSAGES), list(MESSAGES.values())
+    actions, action_weights = list(ACTIONS), list(ACTIONS.values())
+    for day, count in day_counts(total, days, datetime.now().date()):
+        start = datetime.combine(day, datetime.min.time())
+        hours = rng.choices(range(24), HOURLY_WEIGHTS, k=count)
+        seconds = sorted(hour * 3600 + rng.random() * 3600 for hour in hours)
+        picked_cameras = rng.choices(cameras, camera_weights, k=count)
+        picked_users = rng.choices(user_ids, user_weights, k=count)
+        picked_messages = rng.choices(messages, message_weights, k=count)
+        picked_actions = rng.choices(actions, action_weights, k=count)
+        for i in range(count):
+            event_time = start + timedelta(seconds=seconds[i])
+            camera_id, camera_location = picked_cameras[i]
+            yield {
+                "user_id": picked_users[i], "log_image": None, "log_video": None,
+                "create_date": str(event_time), "event_time": event_time, "message": picked_messages[i],
+                "camera_id": f"Camera{camera_id}", "camera_location": camera_location,
+                "action": picked_actions[i], "time_to_action": str(int(rng.expovariate(1 / 45))),
+                "status": "true" if rng.random() < 0.8 else "false",
+            }
+
+
+def drop_analytics_indexes(conn):
+    for index in Analytics.__table__.indexes:
+        conn.execute(text(f'DROP INDEX IF EXISTS "{index.name}"'))
+    for trigger in FTS_TRIGGERS:
+        conn.execute(text(f'DROP TRIGGER IF EXISTS "{trigger}"'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--analytics", type=int, default=1000000, help="analytics events to create")
+    parser.add_argument("--cameras", type=int, default=50)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--subscriptions-per-user", type=float, default=1.5, help="average")
+    parser.add_argument("--days", type=int, default=90, help="events are spread over the last N days")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=50000, help="rows per insert transaction")
+    parser.add_argument("--reset", action="store_true", help="delete existing rows in the seeded tables first")
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+
+    def step(message):
+        print(f"{time.perf_counter() - started:7.1f}s  {message}", flush=True)
+
+    with app.app_context():
+        init_db()
+        if args.reset:
+            clear_analytics_partitions()  # archived months would be counted again by the rebuilds
+        # One connection for the whole load, so the pragmas apply to every insert
+        with db.engine.connect() as conn:
+            for name, value in LOAD_PRAGMAS.items():
+                conn.execute(text(f"PRAGMA {name}={value}"))
+            drop_analytics_indexes(conn)
+            if args.reset:
+                for model in (Analytics, AnalyticsRollup, DashboardCounter, Camera, User, Subscription):
+                    conn.execute(model.__table__.delete())
+                conn.execute(MediaObject.__table__.update().values(ref_count=0))
+
+            cameras = seed_cameras(conn, rng, args.cameras)
+            user_ids = seed_users(conn, rng, args.users)
+            subscriptions = seed_subscriptions(conn, rng, user_ids, args.subscriptions_per_user)
+            conn.commit()
+            step(f"{len(cameras)} cameras, {len(user_ids)} users, {subscriptions} subscriptions")
+
+            chunk, inserted = [], 0
+            for row in analytics_rows(rng, args.analytics, args.days, cameras, user_ids):
+                chunk.append(row)
+                if len(chunk) == args.chunk_size:
+                    conn.execute(insert(Analytics), chunk)
+                    conn.commit()
+                    inserted += len(chunk)
+                    chunk = []
+                    if inserted % (args.chunk_size * 10) == 0:
+                        step(f"{inserted} analytics rows")
+            if chunk:
+                conn.execute(insert(Analytics), chunk)
+                conn.commit()
+                inserted += len(chunk)
+            step(f"{inserted} analytics rows inserted")
+
+        create_missing_indexes()
+        step("analytics indexes rebuilt")
+        if app.config['SEARCH_USE_FTS']:
+            create_fts_index()  # triggers are missing, so this rebuilds the whole index
+            step("search index rebuilt")
+        rebuild_dashboard_counters()
+        rebuild_analytics_rollups()
+        step("dashboard counters and time-series rollups rebuilt")
+        with db.engine.connect() as conn:
+            conn.execute(text("PRAGMA optimize"))
+            conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        step("done")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""Read/write concurrency benchmark for the SQLite storage profiles.
+
+For each profile (SQLITE_PROFILE=off, then wal) it seeds a scratch database and
+runs writer and reader processes against it at the same time for a fixed
+duration. Writers post single events to /analytics-batch, the small commits
+/analytics-action makes; readers stream the whole table through
+/analytics-report as CSV, the longest read the API does. Each process imports
+the app on its own, like separate server workers.
+
+Usage:
+    python sqlite_benchmark.py [--writers 4] [--readers 2] [--duration 10] [--rows 50000]
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+
+PROFILES = ("off", "wal")
+
+
+def load_app(database_url, profile):
+    """Import the app for one profile; must run before anything else imports it."""
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["SQLITE_PROFILE"] = profile
+    import app
+    return app
+
+
+def seed(database_url, profile, rows):
+    app = load_app(database_url, profile)
+    with app.app.app_context():
+        app.init_db()
+        for start in range(0, rows, 5000):
+            batch = []
+            for i in range(start, min(start + 5000, rows)):
+                event_time = app.datetime(2025, 1, 1) + app.timedelta(seconds=i * 30)
+                batch.append({
+                    "user_id": f"user{i % 50}", "camera_id": f"Camera{i % 6 + 1}", "message": "Boots",
+                    "status": "true" if i % 3 else "false", "create_date": str(event_time), "event_time": event_time,
+                    "log_image": None, "log_video": None, "camera_location": "Gate", "action": None,
+                    "time_to_action": None,
+                })
+            app.insert_analytics_rows(batch)
+            app.db.session.commit()
+
+
+def writer(database_url, profile, start_at, stop_at, results):
+    app = load_app(database_url, profile)
+    client = app.app.test_client()
+    latencies, errors = [], {}
+    time.sleep(max(0, start_at - time.time()))
+    while time.time() < stop_at:
+        event = {"user_id": "bench", "camera_id": "Camera1", "message": "Boots", "status": "true"}
+        started = time.perf_counter()
+        response = client.post("/analytics-batch", json={"events": [event]})
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - started)
+        else:
+            message = (response.get_json() or {}).get("message", str(response.status_code))
+            errors[message] = errors.get(message, 0) + 1
+    results.put(("write", latencies, errors))
+
+
+def reader(database_url, profile, start_at, stop_at, results):
+    app = load_app(database_url, profile)
+    client = app.app.test_client()
+    with app.app.app_context():
+        headers = {"Authorization": "Bearer " + app.create_access_token(identity="bench")}
+    latencies, errors = [], {}
+    time.sleep(max(0, start_at - time.time()))
+    while time.time() < stop_at:
+        started = time.perf_counter()
+        try:
+            response = client.post("/analytics-report", headers=headers, json={
+                "start_date": "2000-01-01", "end_date": "2100-01-01", "format": "csv"})
+            response.get_data()  # drain the stream; the read lasts until the last row is sent
+            ok = response.status_code == 200
+            message = str(response.status_code)
+        except Exception as e:  # errors raised mid-stream surface here
+            ok, message = False, str(e)
+        if ok:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors[message] = errors.get(message, 0) + 1
+    results.put(("read", latencies, errors))
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_profile(profile, args):
+    work_dir = tempfile.mkdtemp(prefix=f"sqlite_bench_{profile}_")
+    database_url = "sqlite:///" + os.path.join(work_dir, "bench.db")
+    ctx = multiprocessing.get_context("spawn")
+    try:
+        seeder = ctx.Process(target=seed, args=(database_url, profile, args.rows))
+        seeder.start()
+        seeder.join()
+
+        results = ctx.Queue()
+        start_at = time.time() + 5  # every worker imports the app before the clock starts
+        stop_at = start_at + args.duration
+        workers = [ctx.Process(target=writer, args=(database_url, profile, start_at, stop_at, results))
+                   for _ in range(args.writers)]
+        workers += [ctx.Process(target=reader, args=(database_url, profile, start_at, stop_at, results))
+                    for _ in range(args.readers)]
+        for worker in workers:
+            worker.start()
+        collected = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    summary = {}
+    for kind in ("write", "read"):
+        latencies = [value for k, values, _ in collected if k == kind for value in values]
+        errors = {}
+        for k, _, worker_errors in collected:
+            if k == kind:
+                for message, count in worker_errors.items():
+                    errors[message] = errors.get(message, 0) + count
+        summary[kind] = (latencies, errors)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=10, help="seconds of concurrent load per profile")
+    parser.add_argument("--rows", type=int, default=50000, help="analytics rows seeded before the run")
+    args = parser.parse_args()
+
+    print(f"{args.writers} writer(s), {args.readers} reader(s), {args.duration:g}s, {args.rows} seeded rows\n")
+    print(f"{'profile':8} {'kind':6} {'ok':>7} {'errors':>7} {'per sec':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for profile in PROFILES:
+        summary = run_profile(profile, args)
+        for kind, (latencies, errors) in summary.items():
+            failed = sum(errors.values())
+            print(f"{profile:8} {kind:6} {len(latencies):7} {failed:7} {len(latencies) / args.duration:8.1f} "
+                  f"{percentile(latencies, 50) * 1000:8.1f} {percentile(latencies, 95) * 1000:8.1f} "
+                  f"{percentile(latencies, 100) * 1000:8.1f}")
+            for message, count in sorted(errors.items(), key=lambda item: -item[1])[:3]:
+                print(f"{'':16}{count} x {' '.join(message.split())[:90]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())